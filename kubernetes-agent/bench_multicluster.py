@@ -0,0 +1,108 @@
+# Multi-Cluster Fan-Out Benchmark
+# Purpose: Show that listing pods across N clusters costs the slowest cluster,
+#          not the sum of all of them.
+#
+# Starts N fake API servers with different request latencies, writes one
+# kubeconfig with a context per server, then lists pods in every cluster
+# sequentially and through clusters.fan_out (one lazily created client per
+# context from ClusterRegistry when the kubernetes client is installed,
+# plain HTTP otherwise).
+#
+# Usage:
+#   python bench_multicluster.py [--clusters 12] [--pods 200] [--max-latency 1.0] [--timeout 10]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+import fake_apiserver
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from clusters import ClusterRegistry, fan_out, merge_rows
+
+
+def start_clusters(count, pods, max_latency):
+    servers, urls = [], {}
+    for i in range(count):
+        cluster = fake_apiserver.synthesize(namespaces=2, pods=pods, events=0, log_lines=0, seed=i)
+        cluster.api_latency = max_latency * (i + 1) / count
+        server, url = fake_apiserver.serve(cluster)
+        servers.append(server)
+        urls[f"cluster-{i:02d}"] = url
+    return servers, urls
+
+
+def http_lister(urls):
+    def list_pods(context):
+        with urllib.request.urlopen(f"{urls[context]}/api/v1/pods", timeout=30) as response:
+            return json.load(response)["items"]
+    return list_pods, lambda pods: [
+        (p["metadata"]["namespace"], p["metadata"]["name"], p["status"].get("phase", "")) for p in pods
+    ]
+
+
+def client_lister(registry):
+    def list_pods(context):
+        return registry.core_v1(context).list_pod_for_all_namespaces().items
+    return list_pods, lambda pods: [(p.metadata.namespace, p.metadata.name, p.status.phase) for p in pods]
+
+
+def run(list_pods, rows_of, contexts, timeout):
+    start = time.perf_counter()
+    for context in contexts:
+        list_pods(context)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = fan_out(contexts, list_pods, timeout=timeout)
+    parallel = time.perf_counter() - start
+    rows, errors = merge_rows(results, rows_of)
+    return sequential, parallel, results, rows, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-cluster fan-out benchmark")
+    parser.add_argument("--clusters", type=int, default=12)
+    parser.add_argument("--pods", type=int, default=200)
+    parser.add_argument("--max-latency", type=float, default=1.0, help="latency of the slowest cluster (s)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-cluster timeout (s)")
+    args = parser.parse_args()
+
+    servers, urls = start_clusters(args.clusters, args.pods, args.max_latency)
+    kubeconfig = fake_apiserver.write_multi_kubeconfig(
+        os.path.join(tempfile.mkdtemp(), "kubeconfig"), urls
+    )
+
+    try:
+        registry = ClusterRegistry(kubeconfig)
+        contexts = registry.contexts()
+        list_pods, rows_of = client_lister(registry)
+        mode = "kubernetes client (ClusterRegistry)"
+    except ImportError:
+        registry = None
+        contexts = list(urls)
+        list_pods, rows_of = http_lister(urls)
+        mode = "plain HTTP (kubernetes client not installed)"
+
+    # warm up connections / lazily built clients once per cluster
+    fan_out(contexts, list_pods, timeout=args.timeout)
+
+    sequential, parallel, results, rows, errors = run(list_pods, rows_of, contexts, args.timeout)
+    slowest = max(results, key=lambda r: r.seconds)
+
+    print(f"mode:        {mode}")
+    print(f"clusters:    {len(contexts)}  pods/cluster: {args.pods}  merged rows: {len(rows)}  errors: {len(errors)}")
+    print(f"sequential:  {sequential:.3f}s  (sum of clusters)")
+    print(f"fan-out:     {parallel:.3f}s")
+    print(f"slowest:     {slowest.seconds:.3f}s  ({slowest.cluster})")
+    print(f"speedup:     {sequential / parallel:.1f}x   overhead vs slowest: {(parallel - slowest.seconds) * 1000:.0f}ms")
+
+    if registry is not None:
+        registry.close()
+    for server in servers:
+        server.shutdown()
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,83 @@
+# Startup Benchmark
+# Purpose: Keep CLI agent startup fast. Measures `python -X importtime` for the
+#          agent module and wall time of a no-argument (usage error) run, and
+#          fails when either exceeds its budget.
+#
+# Usage:
+#   python bench_startup.py [--module kubernetes_agent_v2] [--runs 10]
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_MS = 100        # cumulative import time of the agent module
+USAGE_BUDGET_MS = 300         # wall time of `python <agent>.py` (interpreter included)
+TOP_N = 10
+
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# ============================================================
+# MEASUREMENTS
+# ============================================================
+
+def import_profile(module):
+    """Return (module cumulative ms, [(self_us, name), ...]) from -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr)
+
+    total_us = 0
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append((int(self_us), name))
+        if name == module and not indent:
+            total_us = int(cumulative_us)
+    return total_us / 1000, sorted(entries, reverse=True)[:TOP_N]
+
+
+def usage_wall(module, runs):
+    script = os.path.join(HERE, f"{module}.py")
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script], cwd=HERE, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time and startup budget check")
+    parser.add_argument("--module", default="kubernetes_agent_v2")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    import_ms, slowest = import_profile(args.module)
+    wall_ms = usage_wall(args.module, args.runs)
+
+    print(f"import {args.module}: {import_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    print(f"usage-error run (median of {args.runs}): {wall_ms:.1f} ms (budget {USAGE_BUDGET_MS} ms)")
+    print("slowest imports (self time):")
+    for self_us, name in slowest:
+        print(f"  {self_us / 1000:8.2f} ms  {name}")
+
+    if import_ms > IMPORT_BUDGET_MS or wall_ms > USAGE_BUDGET_MS:
+        print("OVER BUDGET")
+        sys.exit(1)
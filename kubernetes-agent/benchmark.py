@@ -0,0 +1,305 @@
+# Agent Benchmark Harness
+# Purpose: Drive every agent entry point against the fake API server and
+#          record latency, memory high-water and API call counts.
+#
+# Scenarios:
+#   v1.diagnose            kubernetes_agent_v1.diagnose(ns, pod)
+#   v2.diagnose            kubernetes_agent_v2.diagnose(ns, pod)  (fake LLM)
+#   core.get_pods_all      agent-core "get pods all namespaces"   (needs kubectl)
+#   core.failed_pods       agent-core "failed pods"               (needs kubectl)
+#   core.get_services_all  agent-core "get services all namespaces"
+#   mcp.kubectl            k8s_mcp_server kubectl("get pods -A")  (needs kubectl + mcp)
+#
+# Usage:
+#   python benchmark.py --namespaces 20 --pods 5000 --events 2000 --iterations 20
+#   python benchmark.py --fixture cluster.json --report bench_report.json
+#   python benchmark.py --baseline old_report.json     (exit 1 on regression)
+
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import fake_apiserver
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+HERE = os.path.dirname(os.path.abspath(__file__))
+LINUX_AGENT = os.path.join(HERE, "..", "linux-agent")
+sys.path.append(LINUX_AGENT)    # agent-core.py / k8s_mcp_server.py import their siblings
+REGRESSION_TOLERANCE = 0.20     # allowed p99 slowdown vs baseline
+CACHE_LIVE_TIMEOUT = 10.0       # seconds to wait for agent-core's watches before timing
+
+
+class Skip(Exception):
+    pass
+
+# ============================================================
+# AGENT LOADERS
+# ============================================================
+
+def load_path(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def require(module_name):
+    try:
+        importlib.import_module(module_name)
+    except ImportError as e:
+        raise Skip(f"{module_name} not installed ({e})")
+
+
+def require_kubectl():
+    if not shutil.which("kubectl"):
+        raise Skip("kubectl not on PATH")
+
+
+def setup_v1(ctx):
+    require("kubernetes")
+    require("rich")
+    agent = importlib.import_module("kubernetes_agent_v1")
+    ns, pod = ctx["target"]
+    return lambda: agent.diagnose(ns, pod)
+
+
+def setup_v2(ctx):
+    require("kubernetes")
+    require("rich")
+    require("openai")
+    from openai import OpenAI
+
+    agent = importlib.import_module("kubernetes_agent_v2")
+    agent.llm_client = OpenAI(base_url=ctx["url"] + "/v1", api_key="bench")
+    ns, pod = ctx["target"]
+    return lambda: agent.diagnose(ns, pod)
+
+
+def wait_live(cache, timeout=CACHE_LIVE_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        watches = cache.stats()["watches"]
+        if watches and all(w["live"] for w in watches.values()):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def setup_core(message):
+    def setup(ctx):
+        require_kubectl()
+        core = load_path("agent_core", os.path.join(LINUX_AGENT, "agent-core.py"))
+        # own cache per scenario: its watches are stopped in teardown and its
+        # hits / misses / bypasses are reported with the scenario
+        cache = importlib.import_module("result_cache").WatchCache()
+        ctx["cache"], ctx["teardown"] = cache, cache.stop
+        agent = core.KubernetesAgent(cache=cache)
+        agent.handle(message)       # starts the watches this intent reads through
+        wait_live(cache)            # if they never go live, every read shows up as a bypass
+        return lambda: agent.handle(message)
+    return setup
+
+
+def setup_mcp(ctx):
+    require_kubectl()
+    require("mcp")
+    server = load_path("k8s_mcp_server", os.path.join(LINUX_AGENT, "k8s_mcp_server.py"))
+    return lambda: server.kubectl("get pods -A")
+
+
+SCENARIOS = [
+    ("v1.diagnose", setup_v1),
+    ("v2.diagnose", setup_v2),
+    ("core.get_pods_all", setup_core("get pods all namespaces")),
+    ("core.failed_pods", setup_core("failed pods")),
+    ("core.get_services_all", setup_core("get services all namespaces")),
+    ("mcp.kubectl", setup_mcp),
+]
+
+# ============================================================
+# MEASUREMENT
+# ============================================================
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def api_calls(cluster):
+    with cluster.cond:
+        return dict(cluster.calls)
+
+
+def call_delta(before, after):
+    return {k: after[k] - before.get(k, 0) for k in after if after[k] - before.get(k, 0)}
+
+
+def measure(op, cluster, iterations, warmup):
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for _ in range(warmup):
+            op()
+
+        latencies = []
+        before = api_calls(cluster)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            op()
+            latencies.append(time.perf_counter() - start)
+        calls = call_delta(before, api_calls(cluster))
+
+        # Separate pass: tracemalloc slows allocation-heavy code, keep it out of the timings
+        tracemalloc.start()
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "status": "ok",
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "api_calls_per_op": round(sum(calls.values()) / iterations, 2),
+        "api_calls": calls,
+        "python_peak_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=HERE, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+# ============================================================
+# REGRESSION CHECK
+# ============================================================
+
+def compare(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    problems = []
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or old.get("status") != "ok":
+            continue
+        if result.get("status") == "error":
+            problems.append(f"{name}: ok in baseline, now error ({result['reason']})")
+            continue
+        if result.get("status") != "ok":
+            print(f"NOT COMPARED {name}: {result['status']} ({result['reason']})")
+            continue
+        if result["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p99 {old['p99_ms']}ms -> {result['p99_ms']}ms")
+        if result["api_calls_per_op"] > old["api_calls_per_op"]:
+            problems.append(f"{name}: API calls/op {old['api_calls_per_op']} -> {result['api_calls_per_op']}")
+    return problems
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agents against a fake API server")
+    parser.add_argument("--fixture", help="replay a recorded fixture instead of synthetic data")
+    parser.add_argument("--namespaces", type=int, default=10)
+    parser.add_argument("--pods", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--log-lines", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--report", default="bench_report.json")
+    parser.add_argument("--baseline", help="previous report; exit 1 on regression")
+    args = parser.parse_args()
+
+    if args.fixture:
+        cluster = fake_apiserver.FakeCluster.load(args.fixture)
+    else:
+        cluster = fake_apiserver.synthesize(args.namespaces, args.pods, args.events, args.log_lines)
+    cluster.llm_latency = args.llm_latency
+
+    server, url = fake_apiserver.serve(cluster)
+    kubeconfig = fake_apiserver.write_kubeconfig(os.path.join(tempfile.mkdtemp(), "kubeconfig"), url)
+    os.environ["KUBECONFIG"] = kubeconfig     # agents read it at import / kubectl invocation
+    # synthetic diagnoses must not land in the real incident history
+    os.environ["AGENT_HISTORY_DB"] = os.path.join(os.path.dirname(kubeconfig), "history.db")
+
+    failing = [
+        key for key, pod in cluster.pods.items()
+        if fake_apiserver._pod_status(pod)[0] in fake_apiserver.FAILURE_REASONS
+    ]
+    ctx = {"url": url, "cluster": cluster, "target": failing[0] if failing else next(iter(cluster.pods))}
+
+    selected = set(args.only.split(",")) if args.only else None
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "dataset": {
+            "fixture": args.fixture,
+            "namespaces": len({ns for ns, _ in cluster.pods}),
+            "pods": len(cluster.pods),
+            "services": len(cluster.services),
+            "events": sum(len(v) for v in cluster.events.values()),
+            "log_lines": cluster.log_lines,
+        },
+        "scenarios": {},
+    }
+
+    for name, setup in SCENARIOS:
+        if selected and name not in selected:
+            continue
+        try:
+            op = setup(ctx)
+            result = measure(op, cluster, args.iterations, args.warmup)
+            if "cache" in ctx:
+                stats = ctx["cache"].stats()
+                result["cache"] = {k: stats[k] for k in ("hits", "misses", "bypasses")}
+        except Skip as e:
+            result = {"status": "skipped", "reason": str(e)}
+        except Exception as e:
+            result = {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+        finally:
+            ctx.pop("cache", None)
+            ctx.pop("teardown", lambda: None)()
+        report["scenarios"][name] = result
+
+        if result["status"] == "ok":
+            cache = result.get("cache")
+            print(f"{name:24} p50={result['p50_ms']:>9.2f}ms  p99={result['p99_ms']:>9.2f}ms  "
+                  f"api/op={result['api_calls_per_op']:>6}  peak={result['python_peak_mb']}MB"
+                  + (f"  cache hit/miss/bypass={cache['hits']}/{cache['misses']}/{cache['bypasses']}" if cache else ""))
+        else:
+            print(f"{name:24} {result['status']}: {result['reason']}")
+
+    server.shutdown()
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f))
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+# Kubernetes Agent – Controller Mode
+# Purpose: Long-running auto-remediation loop built on the v2 agent.
+#
+#   pod watch → predicate → work queue (dedupe, backoff, rate limit)
+#             → N workers → rule_engine + LLM reasoning → restart_pod
+#             → per-workload circuit breaker (no restart storms)
+#
+# Usage:
+#   python controller.py [--workers 4] [--namespace default] [--rules-only]
+#
+# Try it without a cluster:
+#   python fake_apiserver.py --kubeconfig /tmp/fake-kubeconfig &
+#   KUBECONFIG=/tmp/fake-kubeconfig python controller.py --rules-only
+
+import argparse
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
+from rich import print
+from rich.panel import Panel
+
+import kubernetes_agent_v2 as agent
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import counter, serve_metrics, span
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+WORKERS = 4
+MAX_RETRIES = 5                 # reconcile failures before a key is dropped
+WATCH_TIMEOUT = 300             # seconds per watch request before re-watch
+REMEDIABLE = ["CrashLoopBackOff", "OOMKilled", "Error"]
+RULE_SAFE = ["CrashLoopBackOff", "OOMKilled"]   # --rules-only restart set
+
+# Circuit breaker: at most BREAKER_MAX restarts per workload per window
+BREAKER_MAX = 3
+BREAKER_WINDOW = 600
+BREAKER_COOLDOWN = 900
+
+RECONCILES = counter("controller_reconciles_total", "Reconcile outcomes by result")
+
+# ============================================================
+# WORK QUEUE (DEDUPE + RATE LIMIT + BACKOFF)
+# ============================================================
+
+class TokenBucket:
+    """Overall queue rate limit; returns the delay a new item must wait."""
+
+    def __init__(self, qps, burst, clock=time.monotonic):
+        self.qps = qps
+        self.burst = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.last = clock()
+
+    def reserve(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.qps)
+        self.last = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.qps
+
+
+class RateLimitingQueue:
+    """
+    Work queue with controller-runtime semantics:
+      - a key is queued at most once (dirty set)
+      - a key being processed is never handed to a second worker; if it is
+        re-added meanwhile, it is queued again once done() is called
+      - add_rate_limited() delays by max(per-key exponential backoff, token bucket)
+    """
+
+    def __init__(self, base_delay=0.005, max_delay=300.0, qps=10.0, burst=100, clock=time.monotonic):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(qps, burst, clock)
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._dirty = set()
+        self._processing = set()
+        self._waiting = []          # heap of (ready_at, seq, key)
+        self._seq = 0
+        self._failures = {}
+        self._shutdown = False
+
+    def add(self, key):
+        with self._cond:
+            if self._shutdown or key in self._dirty:
+                return
+            self._dirty.add(key)
+            if key not in self._processing:
+                self._queue.append(key)
+                self._cond.notify()
+
+    def add_after(self, key, delay):
+        if delay <= 0:
+            return self.add(key)
+        with self._cond:
+            if self._shutdown:
+                return
+            self._seq += 1
+            heapq.heappush(self._waiting, (self.clock() + delay, self._seq, key))
+            self._cond.notify()
+
+    def add_rate_limited(self, key):
+        with self._cond:
+            failures = self._failures.get(key, 0)
+            self._failures[key] = failures + 1
+            backoff = min(self.base_delay * (2 ** failures), self.max_delay)
+            delay = max(backoff, self.bucket.reserve())
+        self.add_after(key, delay)
+
+    def forget(self, key):
+        with self._cond:
+            self._failures.pop(key, None)
+
+    def num_requeues(self, key):
+        with self._cond:
+            return self._failures.get(key, 0)
+
+    def _promote_ready(self):
+        now = self.clock()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, key = heapq.heappop(self._waiting)
+            if key not in self._dirty:
+                self._dirty.add(key)
+                if key not in self._processing:
+                    self._queue.append(key)
+
+    def get(self):
+        """Block until a key is ready; returns None once the queue is shut down."""
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                self._promote_ready()
+                if self._queue:
+                    key = self._queue.popleft()
+                    self._dirty.discard(key)
+                    self._processing.add(key)
+                    return key
+                timeout = self._waiting[0][0] - self.clock() if self._waiting else None
+                self._cond.wait(timeout)
+
+    def done(self, key):
+        with self._cond:
+            self._processing.discard(key)
+            if key in self._dirty:
+                self._queue.append(key)
+                self._cond.notify()
+
+    def shut_down(self):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._queue) + len(self._waiting)
+
+# ============================================================
+# CIRCUIT BREAKER (PER WORKLOAD)
+# ============================================================
+
+class CircuitBreaker:
+    """
+    closed    → restarts allowed while fewer than max_restarts in window
+    open      → no restarts until cooldown expires
+    half-open → one trial restart; if the workload needs another restart
+                within window the breaker re-opens, otherwise it closes
+    """
+
+    def __init__(self, max_restarts=BREAKER_MAX, window=BREAKER_WINDOW, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.max_restarts = max_restarts
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._history = {}
+        self._open_until = {}
+        self._trial_at = {}
+        self._trial_pending = set()
+        self._reserved = {}             # workload -> slots claimed by allow(), not yet recorded
+
+    def _recent(self, workload, now):
+        history = self._history.setdefault(workload, deque())
+        while history and now - history[0] > self.window:
+            history.popleft()
+        return history
+
+    def allow(self, workload):
+        """Claim a restart slot for `workload`; call record() once restarted or release() if not."""
+        now = self.clock()
+        with self._lock:
+            until = self._open_until.get(workload)
+            if until is not None:
+                if now < until:
+                    return False
+                if workload in self._trial_pending:
+                    return False            # the one half-open trial is already in flight
+                trial = self._trial_at.get(workload)
+                if trial is None:
+                    self._trial_at[workload] = now
+                    self._trial_pending.add(workload)
+                    return True
+                if now - trial < self.window:
+                    self._open_until[workload] = now + self.cooldown
+                    del self._trial_at[workload]
+                    return False
+                self._open_until.pop(workload)
+                self._trial_at.pop(workload)
+                self._history.pop(workload, None)
+
+            history = self._recent(workload, now)
+            if len(history) >= self.max_restarts:
+                self._open_until[workload] = now + self.cooldown
+                return False
+            history.append(now)             # reserved until record() / release()
+            self._reserved.setdefault(workload, []).append(now)
+            return True
+
+    def record(self, workload):
+        now = self.clock()
+        with self._lock:
+            if workload in self._trial_pending:
+                self._trial_pending.discard(workload)
+                self._trial_at[workload] = now
+            elif self._reserved.get(workload):
+                self._reserved[workload].pop(0)
+            elif workload in self._open_until:
+                self._trial_at[workload] = now
+            else:
+                self._recent(workload, now).append(now)
+
+    def release(self, workload):
+        """Give back a slot claimed by allow() when the pod was not restarted."""
+        with self._lock:
+            if workload in self._trial_pending:
+                self._trial_pending.discard(workload)
+                self._trial_at.pop(workload, None)
+                return
+            reserved = self._reserved.get(workload)
+            if reserved:
+                slot = reserved.pop()
+                history = self._history.get(workload)
+                if history and slot in history:
+                    history.remove(slot)
+
+    def state(self, workload):
+        with self._lock:
+            until = self._open_until.get(workload)
+            if until is None:
+                return "closed"
+            return "open" if self.clock() < until else "half-open"
+
+# ============================================================
+# CONTROLLER
+# ============================================================
+
+def pod_key(pod):
+    return f"{pod.metadata.namespace}/{pod.metadata.name}"
+
+
+def workload_of(pod):
+    """Group replicas of the same owner so a crashlooping Deployment shares one breaker."""
+    owners = pod.metadata.owner_references or []
+    for ref in owners:
+        if ref.controller:
+            return f"{pod.metadata.namespace}/{ref.kind}/{ref.name}"
+    return f"{pod.metadata.namespace}/Pod/{pod.metadata.name}"
+
+
+def completed(pod):
+    """Pods that ran to completion (Job pods): phase Succeeded or a container exited 0."""
+    if pod.status.phase == "Succeeded":
+        return True
+    for cs in pod.status.container_statuses or []:
+        terminated = cs.state.terminated if cs.state else None
+        if terminated and terminated.exit_code == 0:
+            return True
+    return False
+
+
+def terminating(pod):
+    """Already being deleted (e.g. by our own restart) – MODIFIED events may still show the old failure."""
+    return pod.metadata.deletion_timestamp is not None
+
+
+def needs_attention(pod):
+    """Watch predicate: only unhealthy pods reach the queue."""
+    return not completed(pod) and not terminating(pod) and agent.rule_engine(pod) in REMEDIABLE
+
+
+class Controller:
+    def __init__(self, namespace=None, workers=WORKERS, rules_only=False, queue=None, breaker=None):
+        self.namespace = namespace
+        self.workers = workers
+        self.rules_only = rules_only
+        self.queue = queue or RateLimitingQueue()
+        self.breaker = breaker or CircuitBreaker()
+        self.stopped = threading.Event()
+
+    # ---------------- WATCH ----------------
+    def _list(self):
+        if self.namespace:
+            return agent.v1.list_namespaced_pod(self.namespace)
+        return agent.v1.list_pod_for_all_namespaces()
+
+    def _watch_func(self):
+        if self.namespace:
+            return agent.v1.list_namespaced_pod, {"namespace": self.namespace}
+        return agent.v1.list_pod_for_all_namespaces, {}
+
+    def watch_pods(self):
+        resource_version = None
+        while not self.stopped.is_set():
+            try:
+                if resource_version is None:
+                    pods = self._list()
+                    for pod in pods.items:
+                        if needs_attention(pod):
+                            self.queue.add(pod_key(pod))
+                    resource_version = pods.metadata.resource_version
+
+                func, kwargs = self._watch_func()
+                w = watch.Watch()
+                for event in w.stream(func, resource_version=resource_version,
+                                      timeout_seconds=WATCH_TIMEOUT, **kwargs):
+                    if self.stopped.is_set():
+                        w.stop()
+                        break
+                    pod = event["object"]
+                    resource_version = pod.metadata.resource_version
+                    if event["type"] != "DELETED" and needs_attention(pod):
+                        self.queue.add(pod_key(pod))
+            except ApiException as e:
+                if e.status == 410:
+                    resource_version = None      # history expired: relist
+                    continue
+                print(f"[red]watch error: {e.status} {e.reason}[/red]")
+                self.stopped.wait(5)
+            except Exception as e:
+                print(f"[red]watch error: {e}[/red]")
+                self.stopped.wait(5)
+
+    # ---------------- WORKERS ----------------
+    def worker(self):
+        while True:
+            key = self.queue.get()
+            if key is None:
+                return
+            try:
+                with span("controller.reconcile", kind="agent", key=key):
+                    self.reconcile(key)
+                self.queue.forget(key)
+            except Exception as e:
+                RECONCILES.inc(result="error")
+                if self.queue.num_requeues(key) < MAX_RETRIES:
+                    print(f"[yellow]{key}: {e} (requeued)[/yellow]")
+                    self.queue.add_rate_limited(key)
+                else:
+                    print(f"[red]{key}: dropped after {MAX_RETRIES} retries: {e}[/red]")
+                    self.queue.forget(key)
+            finally:
+                self.queue.done(key)
+
+    def decide(self, namespace, name, issue):
+        if self.rules_only:
+            return {"root_cause": issue, "fix": "Restart pod", "auto_safe": "yes" if issue in RULE_SAFE else "no"}
+        context = {
+            "namespace": namespace,
+            "pod": name,
+            "issue": issue,
+            "events": agent.get_events(namespace, name),
+            "logs": agent.get_logs(namespace, name),
+        }
+        return agent.llm_reasoning(context)
+
+    def reconcile(self, key):
+        namespace, name = key.split("/", 1)
+        try:
+            pod = agent.v1.read_namespaced_pod(name, namespace)
+        except ApiException as e:
+            if e.status == 404:
+                RECONCILES.inc(result="gone")
+                return
+            raise
+
+        if terminating(pod):
+            RECONCILES.inc(result="terminating")
+            return
+
+        issue = agent.rule_engine(pod)
+        if completed(pod) or issue not in REMEDIABLE:
+            RECONCILES.inc(result="healthy")
+            return
+
+        workload = workload_of(pod)
+        if not self.breaker.allow(workload):
+            RECONCILES.inc(result="breaker_open")
+            print(f"[yellow]{key}: {issue}, breaker {self.breaker.state(workload)} for {workload} – skipping restart[/yellow]")
+            return
+
+        # allow() claimed a slot: hand it back unless the pod is actually restarted
+        try:
+            reasoning = self.decide(namespace, name, issue)
+            if reasoning.get("auto_safe") != "yes":
+                self.breaker.release(workload)
+                RECONCILES.inc(result="not_auto_safe")
+                print(f"[cyan]{key}: {issue} – {reasoning.get('root_cause')} (not auto-safe)[/cyan]")
+                return
+            agent.restart_pod(namespace, name)
+        except BaseException:
+            self.breaker.release(workload)
+            raise
+        self.breaker.record(workload)
+        RECONCILES.inc(result="restarted")
+        print(Panel(f"{key}: {issue}\n{reasoning.get('root_cause')}\nPod restarted automatically", style="bold red"))
+
+    # ---------------- LIFECYCLE ----------------
+    def run(self):
+        threads = [threading.Thread(target=self.watch_pods, daemon=True)]
+        threads += [threading.Thread(target=self.worker, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            while not self.stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+    def stop(self):
+        self.stopped.set()
+        self.queue.shut_down()
+
+# ============================================================
+# CLI ENTRY POINT
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kubernetes auto-remediation controller")
+    parser.add_argument("--namespace", help="watch a single namespace (default: all)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rules-only", action="store_true", help="skip the LLM; restart on rule verdict")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    print(Panel(f"Controller started – namespace={args.namespace or 'ALL'} workers={args.workers}", style="bold green"))
+    Controller(args.namespace, args.workers, args.rules_only).run()
@@ -0,0 +1,674 @@
+# Fake Kubernetes API Server
+# Purpose: Local, in-process stand-in for the Kubernetes API so the agents
+#          and the controller can be exercised without a real cluster.
+#
+# Serves the small slice of the core/v1 API the agents use:
+#   GET    /api/v1/pods                                (list + ?watch=true)
+#   GET    /api/v1/namespaces/<ns>/pods                (list + ?watch=true)
+#   GET    /api/v1/namespaces/<ns>/pods/<name>
+#   GET    /api/v1/namespaces/<ns>/pods/<name>/log
+#   DELETE /api/v1/namespaces/<ns>/pods/<name>
+#   GET    /api/v1/namespaces/<ns>/events
+#   GET    /api/v1/services, /api/v1/namespaces/<ns>/services
+# plus discovery and meta.k8s.io Table output so plain `kubectl get` works,
+# and fake LLM endpoints (OpenAI /v1/chat/completions, Ollama /api/generate).
+#
+# Backends are pluggable: any FakeCluster can be seeded by hand, synthesized
+# at scale (synthesize) or replayed from a recorded fixture (FakeCluster.load).
+#
+# Usage:
+#   python fake_apiserver.py --port 8001 --kubeconfig /tmp/fake-kubeconfig
+#   python fake_apiserver.py --namespaces 50 --pods 20000 --events 5000
+#   python fake_apiserver.py --fixture cluster.json
+#   python fake_apiserver.py --record cluster.json     (snapshot current kubectl context)
+#   KUBECONFIG=/tmp/fake-kubeconfig python controller.py
+
+import argparse
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+WATCH_HISTORY = 10000      # change events kept for watch resume
+WATCH_TIMEOUT = 30         # default seconds a watch stays open
+FAILURE_REASONS = ["CrashLoopBackOff", "ImagePullBackOff", "OOMKilled", "Error"]
+LLM_REPLY = {
+    "root_cause": "Container exits on startup due to missing configuration.",
+    "fix": "Restart pod after fixing configuration",
+    "auto_safe": "yes",
+    "confidence": "80%",
+}
+
+# ============================================================
+# CLUSTER STATE
+# ============================================================
+
+def make_pod(namespace, name, phase="Running", reason=None, restarts=0, owner=None):
+    """Build a core/v1 Pod object as the API server would serialize it."""
+    if reason == "OOMKilled":
+        state = {"terminated": {"reason": "OOMKilled", "exitCode": 137}}
+    elif reason:
+        state = {"waiting": {"reason": reason}}
+    else:
+        state = {"running": {"startedAt": "2024-01-01T00:00:00Z"}}
+
+    metadata = {
+        "name": name,
+        "namespace": namespace,
+        "uid": str(uuid.uuid4()),
+        "resourceVersion": "0",
+    }
+    if owner:
+        metadata["ownerReferences"] = [{
+            "apiVersion": "apps/v1",
+            "kind": "ReplicaSet",
+            "name": owner,
+            "uid": owner,
+            "controller": True,
+        }]
+
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": metadata,
+        "spec": {"containers": [{"name": "app", "image": "nginx"}]},
+        "status": {
+            "phase": phase,
+            "containerStatuses": [{
+                "name": "app",
+                "image": "nginx",
+                "imageID": "docker.io/library/nginx@sha256:0",
+                "ready": reason is None,
+                "restartCount": restarts,
+                "state": state,
+            }],
+        },
+    }
+
+
+def make_service(namespace, name, port=80):
+    return {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {"name": name, "namespace": namespace, "uid": str(uuid.uuid4())},
+        "spec": {"type": "ClusterIP", "clusterIP": "10.96.0.10", "ports": [{"port": port, "protocol": "TCP"}]},
+    }
+
+
+def make_event(namespace, pod, message, reason="BackOff"):
+    return {
+        "apiVersion": "v1",
+        "kind": "Event",
+        "metadata": {"name": f"{pod}.{uuid.uuid4().hex[:12]}", "namespace": namespace},
+        "involvedObject": {"kind": "Pod", "name": pod, "namespace": namespace},
+        "reason": reason,
+        "message": message,
+        "type": "Warning",
+    }
+
+
+class FakeCluster:
+    """Thread-safe in-memory cluster state with a resourceVersion-ordered change log."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pods = {}
+        self.services = {}
+        self.events = {}
+        self.logs = {}
+        self.log_lines = 0          # synthetic log length for pods without explicit logs
+        self.resource_version = 0
+        self.changes = deque(maxlen=WATCH_HISTORY)
+        self.calls = Counter()
+        self.llm_latency = 0.0
+        self.api_latency = 0.0      # added to every API request (simulates a distant cluster)
+
+    # ---------------- mutations ----------------
+    def _commit(self, event_type, pod):
+        self.resource_version += 1
+        pod["metadata"]["resourceVersion"] = str(self.resource_version)
+        self.changes.append((self.resource_version, event_type, json.loads(json.dumps(pod))))
+        self.cond.notify_all()
+
+    def add_pod(self, namespace, name, **kwargs):
+        pod = make_pod(namespace, name, **kwargs)
+        with self.cond:
+            self.pods[(namespace, name)] = pod
+            self._commit("ADDED", pod)
+        return pod
+
+    def update_pod(self, namespace, name, reason=None, restarts=None, phase=None):
+        with self.cond:
+            pod = self.pods[(namespace, name)]
+            cs = pod["status"]["containerStatuses"][0]
+            fresh = make_pod(namespace, name, reason=reason)["status"]["containerStatuses"][0]
+            cs["state"] = fresh["state"]
+            cs["ready"] = fresh["ready"]
+            if restarts is not None:
+                cs["restartCount"] = restarts
+            if phase is not None:
+                pod["status"]["phase"] = phase
+            self._commit("MODIFIED", pod)
+        return pod
+
+    def delete_pod(self, namespace, name):
+        """Delete a pod; owned pods are recreated by their 'ReplicaSet' in the same state."""
+        with self.cond:
+            pod = self.pods.pop((namespace, name), None)
+            if pod is None:
+                return None
+            self._commit("DELETED", pod)
+
+            owners = pod["metadata"].get("ownerReferences")
+            if owners:
+                owner = owners[0]["name"]
+                cs = pod["status"]["containerStatuses"][0]
+                reason = (cs["state"].get("waiting") or cs["state"].get("terminated") or {}).get("reason")
+                replacement = make_pod(
+                    namespace,
+                    f"{owner}-{uuid.uuid4().hex[:5]}",
+                    phase=pod["status"]["phase"],
+                    reason=reason,
+                    owner=owner,
+                )
+                self.pods[(namespace, replacement["metadata"]["name"])] = replacement
+                if (namespace, name) in self.logs:
+                    self.logs[(namespace, replacement["metadata"]["name"])] = self.logs[(namespace, name)]
+                self._commit("ADDED", replacement)
+            return pod
+
+    def add_event(self, namespace, pod, message, reason="BackOff"):
+        with self.cond:
+            self.events.setdefault(namespace, []).append(make_event(namespace, pod, message, reason))
+
+    def set_logs(self, namespace, pod, text):
+        with self.cond:
+            self.logs[(namespace, pod)] = text
+
+    def add_service(self, namespace, name, **kwargs):
+        with self.cond:
+            self.services[(namespace, name)] = make_service(namespace, name, **kwargs)
+
+    # ---------------- fixtures ----------------
+    def dump(self, path):
+        with self.cond:
+            fixture = {
+                "pods": list(self.pods.values()),
+                "services": list(self.services.values()),
+                "events": [e for items in self.events.values() for e in items],
+                "logs": [{"namespace": ns, "pod": pod, "text": text} for (ns, pod), text in self.logs.items()],
+            }
+        with open(path, "w") as f:
+            json.dump(fixture, f)
+
+    @classmethod
+    def load(cls, path):
+        """Replay a recorded fixture (see dump() and record_fixture())."""
+        with open(path) as f:
+            fixture = json.load(f)
+        cluster = cls()
+        with cluster.cond:
+            for pod in fixture.get("pods", []):
+                meta = pod["metadata"]
+                cluster.pods[(meta["namespace"], meta["name"])] = pod
+                cluster._commit("ADDED", pod)
+            for svc in fixture.get("services", []):
+                meta = svc["metadata"]
+                cluster.services[(meta["namespace"], meta["name"])] = svc
+            for event in fixture.get("events", []):
+                cluster.events.setdefault(event["metadata"]["namespace"], []).append(event)
+            for entry in fixture.get("logs", []):
+                cluster.logs[(entry["namespace"], entry["pod"])] = entry["text"]
+        return cluster
+
+    # ---------------- reads ----------------
+    def list_pods(self, namespace=None):
+        with self.cond:
+            items = [p for (ns, _), p in self.pods.items() if namespace is None or ns == namespace]
+            return items, str(self.resource_version)
+
+    def get_pod(self, namespace, name):
+        with self.cond:
+            return self.pods.get((namespace, name))
+
+    def list_services(self, namespace=None):
+        with self.cond:
+            return [s for (ns, _), s in self.services.items() if namespace is None or ns == namespace]
+
+    def list_events(self, namespace):
+        with self.cond:
+            return list(self.events.get(namespace, []))
+
+    def get_logs(self, namespace, pod, tail_lines=None):
+        with self.cond:
+            text = self.logs.get((namespace, pod))
+        if text is None:
+            lines = self.log_lines if not tail_lines else min(tail_lines, self.log_lines)
+            text = "\n".join(
+                f"2024-01-01T00:00:{i % 60:02d}Z INFO {pod} handled request id={i} status=200"
+                for i in range(lines)
+            )
+        if tail_lines:
+            text = "\n".join(text.splitlines()[-tail_lines:])
+        return text
+
+    def watch(self, since, namespace=None, timeout=WATCH_TIMEOUT):
+        """Yield (type, object) changes newer than `since`; raise LookupError when too old."""
+        deadline = time.monotonic() + timeout
+        last = since
+        while True:
+            with self.cond:
+                if self.changes and last < self.changes[0][0] - 1:
+                    raise LookupError(f"too old resource version: {last}")
+                pending = [c for c in self.changes if c[0] > last]
+                if not pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self.cond.wait(remaining)
+                    continue
+            for rv, event_type, obj in pending:
+                last = rv
+                if namespace is None or obj["metadata"]["namespace"] == namespace:
+                    yield event_type, obj
+
+# ============================================================
+# HTTP FRONT END
+# ============================================================
+
+ROUTES = [
+    ("GET", re.compile(r"^/api/v1/pods$"), "list_pods"),
+    ("GET", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/pods$"), "list_pods"),
+    ("GET", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/pods/(?P<name>[^/]+)$"), "get_pod"),
+    ("GET", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/pods/(?P<name>[^/]+)/log$"), "get_log"),
+    ("DELETE", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/pods/(?P<name>[^/]+)$"), "delete_pod"),
+    ("GET", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/events$"), "list_events"),
+    ("GET", re.compile(r"^/api/v1/services$"), "list_services"),
+    ("GET", re.compile(r"^/api/v1/namespaces/(?P<ns>[^/]+)/services$"), "list_services"),
+    ("GET", re.compile(r"^/version$"), "version"),
+    ("GET", re.compile(r"^/api$"), "api_versions"),
+    ("GET", re.compile(r"^/apis$"), "api_groups"),
+    ("GET", re.compile(r"^/api/v1$"), "api_resources"),
+    ("POST", re.compile(r"^/v1/chat/completions$"), "llm_chat"),
+    ("POST", re.compile(r"^/api/generate$"), "llm_generate"),
+]
+
+API_RESOURCES = [
+    {"name": "pods", "singularName": "pod", "namespaced": True, "kind": "Pod",
+     "verbs": ["get", "list", "watch", "delete"], "shortNames": ["po"]},
+    {"name": "pods/log", "singularName": "", "namespaced": True, "kind": "Pod", "verbs": ["get"]},
+    {"name": "services", "singularName": "service", "namespaced": True, "kind": "Service",
+     "verbs": ["get", "list"], "shortNames": ["svc"]},
+    {"name": "events", "singularName": "event", "namespaced": True, "kind": "Event",
+     "verbs": ["list"], "shortNames": ["ev"]},
+]
+
+
+def _truthy(value):
+    return str(value).lower() in ("true", "1")
+
+
+def _pod_status(pod):
+    cs = pod["status"].get("containerStatuses") or [{}]
+    state = cs[0].get("state", {})
+    reason = (state.get("waiting") or state.get("terminated") or {}).get("reason")
+    return reason or pod["status"].get("phase", "Unknown"), cs[0].get("restartCount", 0), bool(cs[0].get("ready"))
+
+
+def _row_object(obj):
+    meta = obj["metadata"]
+    return {
+        "kind": "PartialObjectMetadata",
+        "apiVersion": "meta.k8s.io/v1",
+        "metadata": {"name": meta["name"], "namespace": meta["namespace"],
+                     "creationTimestamp": "2024-01-01T00:00:00Z"},
+    }
+
+
+def pod_table(pods, rv):
+    """meta.k8s.io/v1 Table, the server-side printing format `kubectl get` asks for."""
+    rows = []
+    for pod in pods:
+        status, restarts, ready = _pod_status(pod)
+        rows.append({
+            "cells": [pod["metadata"]["name"], "1/1" if ready else "0/1", status, restarts, "1d"],
+            "object": _row_object(pod),
+        })
+    return {
+        "kind": "Table",
+        "apiVersion": "meta.k8s.io/v1",
+        "metadata": {"resourceVersion": rv},
+        "columnDefinitions": [
+            {"name": "Name", "type": "string", "format": "name"},
+            {"name": "Ready", "type": "string"},
+            {"name": "Status", "type": "string"},
+            {"name": "Restarts", "type": "integer"},
+            {"name": "Age", "type": "string"},
+        ],
+        "rows": rows,
+    }
+
+
+def service_table(services):
+    rows = []
+    for svc in services:
+        spec = svc["spec"]
+        ports = ",".join(f"{p['port']}/{p['protocol']}" for p in spec["ports"])
+        rows.append({
+            "cells": [svc["metadata"]["name"], spec["type"], spec["clusterIP"], "<none>", ports, "1d"],
+            "object": _row_object(svc),
+        })
+    return {
+        "kind": "Table",
+        "apiVersion": "meta.k8s.io/v1",
+        "metadata": {},
+        "columnDefinitions": [
+            {"name": n, "type": "string", "format": "name" if n == "Name" else ""}
+            for n in ["Name", "Type", "Cluster-IP", "External-IP", "Port(s)", "Age"]
+        ],
+        "rows": rows,
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    cluster = None  # bound by serve()
+    protocol_version = "HTTP/1.1"   # keep-alive, and chunked watch streams like the real apiserver
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _wants_table(self):
+        return "as=Table" in self.headers.get("Accept", "")
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        for verb, pattern, action in ROUTES:
+            match = pattern.match(url.path) if verb == method else None
+            if match:
+                self.cluster.calls[f"{method} {action}"] += 1
+                if self.cluster.api_latency and not action.startswith("llm_"):
+                    time.sleep(self.cluster.api_latency)
+                return getattr(self, action)(query, **match.groupdict())
+        self._send_status(404, "NotFound", f"{method} {url.path} not served")
+
+    # ---------------- responses ----------------
+    def _send_json(self, obj, code=200):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, code, reason, message):
+        self._send_json({
+            "apiVersion": "v1",
+            "kind": "Status",
+            "status": "Failure",
+            "reason": reason,
+            "message": message,
+            "code": code,
+        }, code)
+
+    # ---------------- handlers ----------------
+    def list_pods(self, query, ns=None):
+        if _truthy(query.get("watch")):
+            return self._watch_pods(query, ns)
+        items, rv = self.cluster.list_pods(ns)
+        if self._wants_table():
+            return self._send_json(pod_table(items, rv))
+        self._send_json({"apiVersion": "v1", "kind": "PodList", "metadata": {"resourceVersion": rv}, "items": items})
+
+    def list_services(self, query, ns=None):
+        items = self.cluster.list_services(ns)
+        if self._wants_table():
+            return self._send_json(service_table(items))
+        self._send_json({"apiVersion": "v1", "kind": "ServiceList", "metadata": {}, "items": items})
+
+    def _watch_pods(self, query, ns):
+        since = int(query.get("resourceVersion") or self.cluster.resource_version)
+        timeout = int(query.get("timeoutSeconds") or WATCH_TIMEOUT)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event_type, obj in self.cluster.watch(since, ns, timeout):
+                self._send_chunk({"type": event_type, "object": obj})
+        except LookupError as e:
+            gone = {"kind": "Status", "apiVersion": "v1", "status": "Failure",
+                    "reason": "Expired", "message": str(e), "code": 410}
+            self._send_chunk({"type": "ERROR", "object": gone})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        try:
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_chunk(self, event):
+        """One watch event per chunk, so clients see it as soon as it happens."""
+        data = json.dumps(event).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def get_pod(self, query, ns, name):
+        pod = self.cluster.get_pod(ns, name)
+        if pod is None:
+            return self._send_status(404, "NotFound", f'pods "{name}" not found')
+        self._send_json(pod)
+
+    def get_log(self, query, ns, name):
+        if self.cluster.get_pod(ns, name) is None:
+            return self._send_status(404, "NotFound", f'pods "{name}" not found')
+        tail = int(query["tailLines"]) if query.get("tailLines") else None
+        body = self.cluster.get_logs(ns, name, tail).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def delete_pod(self, query, ns, name):
+        pod = self.cluster.delete_pod(ns, name)
+        if pod is None:
+            return self._send_status(404, "NotFound", f'pods "{name}" not found')
+        self._send_json(pod)
+
+    def list_events(self, query, ns):
+        self._send_json({"apiVersion": "v1", "kind": "EventList", "metadata": {}, "items": self.cluster.list_events(ns)})
+
+    def version(self, query):
+        self._send_json({"major": "1", "minor": "30", "gitVersion": "v1.30.0-fake", "platform": "linux/amd64"})
+
+    def api_versions(self, query):
+        self._send_json({"kind": "APIVersions", "versions": ["v1"], "serverAddressByClientCIDRs": []})
+
+    def api_groups(self, query):
+        self._send_json({"kind": "APIGroupList", "apiVersion": "v1", "groups": []})
+
+    def api_resources(self, query):
+        self._send_json({"kind": "APIResourceList", "apiVersion": "v1", "groupVersion": "v1", "resources": API_RESOURCES})
+
+    # ---------------- fake LLM ----------------
+    def llm_chat(self, query):
+        request = self._read_json()
+        time.sleep(self.cluster.llm_latency)
+        self._send_json({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(LLM_REPLY)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def llm_generate(self, query):
+        request = self._read_json()
+        time.sleep(self.cluster.llm_latency)
+        self._send_json({
+            "model": request.get("model", "fake"),
+            "response": "STATUS: WARNING\nREASON: Synthetic load detected\nCOMMAND: uptime",
+            "done": True,
+        })
+
+# ============================================================
+# SERVER LIFECYCLE
+# ============================================================
+
+def serve(cluster, host="127.0.0.1", port=0):
+    """Start the fake API server in a daemon thread. Returns (server, base_url)."""
+    handler = type("BoundHandler", (Handler,), {"cluster": cluster})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def write_kubeconfig(path, url, context="fake"):
+    """Write a kubeconfig pointing at the fake server (JSON is valid YAML)."""
+    return write_multi_kubeconfig(path, {context: url})
+
+
+def write_multi_kubeconfig(path, urls):
+    """Write a kubeconfig with one context per {context: url}; the first one is current."""
+    kubeconfig = {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": name, "cluster": {"server": url}} for name, url in urls.items()],
+        "users": [{"name": name, "user": {"token": "fake"}} for name in urls],
+        "contexts": [{"name": name, "context": {"cluster": name, "user": name}} for name in urls],
+        "current-context": next(iter(urls)),
+    }
+    with open(path, "w") as f:
+        json.dump(kubeconfig, f, indent=2)
+    return path
+
+
+def seed_crashloop(cluster):
+    """A small demo cluster: healthy pods plus one crashlooping Deployment replica."""
+    cluster.add_pod("default", "nginx-ok")
+    cluster.add_pod("kube-system", "coredns-1")
+    cluster.add_pod("default", "web-6f7c9-abcde", reason="CrashLoopBackOff", restarts=5, owner="web-6f7c9")
+    cluster.add_event("default", "web-6f7c9-abcde", "Back-off restarting failed container app")
+    cluster.set_logs("default", "web-6f7c9-abcde", "starting app\nError: missing DATABASE_URL\n")
+
+
+def synthesize(namespaces=10, pods=1000, events=500, log_lines=200, services=None, failing=0.05, seed=42):
+    """A synthetic cluster: pods spread over namespaces, a failing fraction, events on failing pods."""
+    rng = random.Random(seed)
+    cluster = FakeCluster()
+    cluster.log_lines = log_lines
+    names = [f"ns-{i:03d}" for i in range(namespaces)]
+
+    failing_pods = []
+    for i in range(pods):
+        ns = names[i % namespaces]
+        owner = f"app-{i // 3:05d}-7d9f"
+        name = f"{owner}-{i:06d}"
+        if rng.random() < failing:
+            reason = rng.choice(FAILURE_REASONS)
+            cluster.add_pod(ns, name, phase="Running", reason=reason, restarts=rng.randint(1, 20), owner=owner)
+            failing_pods.append((ns, name, reason))
+        else:
+            cluster.add_pod(ns, name, owner=owner)
+
+    for i in range(services if services is not None else max(1, pods // 10)):
+        cluster.add_service(names[i % namespaces], f"svc-{i:05d}")
+
+    targets = failing_pods or [(ns, name, "Running") for (ns, name) in list(cluster.pods)[:1]]
+    for i in range(events):
+        ns, name, reason = targets[i % len(targets)]
+        cluster.add_event(ns, name, f"Back-off restarting failed container app ({reason}) x{i}")
+    return cluster
+
+
+def record_fixture(path):
+    """Snapshot pods, services and events of the current kubectl context into a fixture."""
+    def kubectl_items(kind):
+        out = subprocess.check_output(["kubectl", "get", kind, "--all-namespaces", "-o", "json"])
+        return json.loads(out)["items"]
+
+    fixture = {
+        "pods": kubectl_items("pods"),
+        "services": kubectl_items("services"),
+        "events": kubectl_items("events"),
+        "logs": [],
+    }
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+    return path
+
+# ============================================================
+# CLI ENTRY POINT
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Kubernetes API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--kubeconfig", default="/tmp/fake-kubeconfig")
+    parser.add_argument("--fixture", help="replay a recorded fixture")
+    parser.add_argument("--record", help="record the current kubectl context to a fixture and exit")
+    parser.add_argument("--namespaces", type=int, default=0)
+    parser.add_argument("--pods", type=int, default=0)
+    parser.add_argument("--events", type=int, default=0)
+    parser.add_argument("--log-lines", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds added to every API request")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"Recorded {record_fixture(args.record)}")
+        raise SystemExit(0)
+
+    if args.fixture:
+        cluster = FakeCluster.load(args.fixture)
+    elif args.pods:
+        cluster = synthesize(max(1, args.namespaces), args.pods, args.events, args.log_lines)
+    else:
+        cluster = FakeCluster()
+        seed_crashloop(cluster)
+    cluster.llm_latency = args.llm_latency
+    cluster.api_latency = args.api_latency
+
+    server, url = serve(cluster, args.host, args.port)
+    write_kubeconfig(args.kubeconfig, url)
+
+    print(f"Fake API server on {url}")
+    print(f"export KUBECONFIG={args.kubeconfig}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,15 +1,28 @@
 # Kubernetes Agent v1.2 – Agentic AI with Local LLM (Ollama)
 # Author: Arunvel Arunachalam 
 # Purpose: Kubernetes troubleshooting using Rules + Local LLM + Safe Actions
-
+#
+# Startup: kubernetes, rich and openai are imported on first use and the
+# API / LLM clients are built lazily, so argument errors return instantly.
+# For batch use, keep a warm process around:
+#   python kubernetes_agent_v2.py --daemon &          # listens on AGENT_SOCKET
+#   python kubernetes_agent_v2.py <namespace> <pod>   # served by the daemon if running
+# The daemon serves requests concurrently, only for the client's own
+# kubeconfig/context; anything else runs locally.
+#
+# Multi-cluster: scan every kubeconfig context concurrently for unhealthy pods
+#   python kubernetes_agent_v2.py --all-clusters [namespace]
+#
+# Every diagnosis is appended to the shared history (AGENT_HISTORY_DB):
+#   python ../shared/history.py top --hours 24
+
+import os
 import sys
 import json
-from kubernetes import client, config
-from kubernetes.client.exceptions import ApiException
-from rich import print
-from rich.table import Table
-from rich.panel import Panel
-from openai import OpenAI
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import counter, span, traced
 
 # ============================================================
 # CONFIGURATION
@@ -17,50 +30,108 @@ from openai import OpenAI
 MODE = "ADVISE"      # ADVISE | APPROVE | AUTO
 LOG_LINES = 50
 LLM_MODEL = "llama3.1:8b"  # Ollama local model
+# private per-user location: $XDG_RUNTIME_DIR, else a 0700 directory under /tmp
+AGENT_SOCKET = os.environ.get("AGENT_SOCKET") or (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "k8s-agent.sock") if os.environ.get("XDG_RUNTIME_DIR")
+    else f"/tmp/k8s-agent-{os.getuid()}/agent.sock"
+)
+DAEMON_TIMEOUT = 180       # seconds to wait for a daemon reply before running locally
+CLUSTER_TIMEOUT = 10       # seconds per cluster in --all-clusters
+HEALTHY = ["Running", "Succeeded"]
 
 # ============================================================
 # LLM CLIENT (LOCAL OLLAMA – OPENAI COMPATIBLE)
 # ============================================================
-llm_client = OpenAI(
-    base_url="http://localhost:11434/v1",
-    api_key="ollama"  # dummy key
-)
+
+def make_llm_client():
+    from openai import OpenAI
+    return OpenAI(
+        base_url="http://localhost:11434/v1",
+        api_key="ollama"  # dummy key
+    )
 
 # ============================================================
 # KUBERNETES CLIENT SETUP
 # ============================================================
 
 def load_k8s():
+    from kubernetes import client, config
     try:
         config.load_kube_config()
     except:
         config.load_incluster_config()
     return client.CoreV1Api(), client.AppsV1Api()
 
-v1, apps_v1 = load_k8s()
+# ============================================================
+# LAZY CLIENTS
+# `agent.v1`, `agent.apps_v1` and `agent.llm_client` still work as module
+# attributes (and can be reassigned); they are only built on first access.
+# ============================================================
+
+def get_v1():
+    if "v1" not in globals():
+        globals()["v1"], globals()["apps_v1"] = load_k8s()
+    return globals()["v1"]
+
+
+def get_apps_v1():
+    get_v1()
+    return globals()["apps_v1"]
+
+
+def get_llm():
+    if "llm_client" not in globals():
+        globals()["llm_client"] = make_llm_client()
+    return globals()["llm_client"]
+
+
+def __getattr__(name):
+    if name == "v1":
+        return get_v1()
+    if name == "apps_v1":
+        return get_apps_v1()
+    if name == "llm_client":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_console = None
+
+def console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+LLM_TOKENS = counter("llm_tokens_total", "Tokens used by LLM reasoning calls")
 
 # ============================================================
 # DATA COLLECTORS
 # ============================================================
 
-def get_pod(namespace, pod):
+@traced("k8s.get_pod", kind="api")
+def get_pod(namespace, pod, out=None):
+    from kubernetes.client.exceptions import ApiException
     try:
-        return v1.read_namespaced_pod(pod, namespace)
+        return get_v1().read_namespaced_pod(pod, namespace)
     except ApiException as e:
         if e.status == 404:
-            print(f"[red]Pod '{pod}' not found in namespace '{namespace}'[/red]")
+            (out or console()).print(f"[red]Pod '{pod}' not found in namespace '{namespace}'[/red]")
             sys.exit(1)
         raise
 
 
+@traced("k8s.get_events", kind="api")
 def get_events(namespace, pod):
-    events = v1.list_namespaced_event(namespace)
+    events = get_v1().list_namespaced_event(namespace)
     return [e.message for e in events.items if e.involved_object.name == pod]
 
 
+@traced("k8s.get_logs", kind="api")
 def get_logs(namespace, pod):
     try:
-        return v1.read_namespaced_pod_log(pod, namespace, tail_lines=LOG_LINES)
+        return get_v1().read_namespaced_pod_log(pod, namespace, tail_lines=LOG_LINES)
     except:
         return "No logs available"
 
@@ -99,6 +170,7 @@ def rule_engine(pod):
 # LLM REASONING (LOCAL AI BRAIN)
 # ============================================================
 
+@traced("llm.reasoning", kind="llm", model=LLM_MODEL)
 def llm_reasoning(context):
     prompt = f"""
 You are a Senior Kubernetes SRE.
@@ -124,27 +196,37 @@ Return STRICT JSON only:
 }}
 """
 
-    response = llm_client.chat.completions.create(
+    response = get_llm().chat.completions.create(
         model=LLM_MODEL,
         messages=[{"role": "user", "content": prompt}],
         temperature=0.1
     )
 
+    usage = getattr(response, "usage", None)
+    if usage:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, model=LLM_MODEL, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, model=LLM_MODEL, type="completion")
+
     return json.loads(response.choices[0].message.content)
 
 # ============================================================
 # ACTION EXECUTOR (SAFE HANDS)
 # ============================================================
 
+@traced("k8s.restart_pod", kind="action")
 def restart_pod(namespace, pod):
-    v1.delete_namespaced_pod(pod, namespace)
+    get_v1().delete_namespaced_pod(pod, namespace)
 
 # ============================================================
 # MAIN AGENT LOGIC (OBSERVE → THINK → ACT)
 # ============================================================
 
-def diagnose(namespace, pod_name):
-    pod = get_pod(namespace, pod_name)
+@traced("agent.diagnose", kind="agent")
+def diagnose(namespace, pod_name, out=None):
+    """out: rich Console to render to (the daemon passes one per request)."""
+    out = out or console()
+    started = time.perf_counter()
+    pod = get_pod(namespace, pod_name, out)
     events = get_events(namespace, pod_name)
     logs = get_logs(namespace, pod_name)
 
@@ -161,39 +243,255 @@ def diagnose(namespace, pod_name):
     reasoning = llm_reasoning(context)
 
     # OUTPUT
-    table = Table(title="Kubernetes Agent Diagnosis")
-    table.add_column("Field", style="cyan")
-    table.add_column("Value", style="green")
+    from rich.table import Table
+    from rich.panel import Panel
 
-    table.add_row("Pod", pod_name)
-    table.add_row("Namespace", namespace)
-    table.add_row("Detected Issue", issue)
-    table.add_row("Root Cause", reasoning.get("root_cause"))
-    table.add_row("Suggested Fix", reasoning.get("fix"))
-    table.add_row("Confidence", reasoning.get("confidence"))
+    with span("agent.render", kind="render"):
+        table = Table(title="Kubernetes Agent Diagnosis")
+        table.add_column("Field", style="cyan")
+        table.add_column("Value", style="green")
 
-    print(table)
+        table.add_row("Pod", pod_name)
+        table.add_row("Namespace", namespace)
+        table.add_row("Detected Issue", issue)
+        table.add_row("Root Cause", reasoning.get("root_cause"))
+        table.add_row("Suggested Fix", reasoning.get("fix"))
+        table.add_row("Confidence", reasoning.get("confidence"))
+
+        out.print(table)
+
+    latency = time.perf_counter() - started
 
     # DECISION & ACTION
+    action = "advised"
     if MODE == "AUTO" and reasoning.get("auto_safe") == "yes":
         restart_pod(namespace, pod_name)
-        print(Panel("Pod restarted automatically", style="bold red"))
+        out.print(Panel("Pod restarted automatically", style="bold red"))
+        action = "restarted (auto)"
 
     if MODE == "APPROVE" and reasoning.get("auto_safe") == "yes":
         choice = input("Approve pod restart? (yes/no): ")
+        action = "declined"
         if choice.lower() == "yes":
             restart_pod(namespace, pod_name)
-            print(Panel("Pod restarted", style="bold red"))
+            out.print(Panel("Pod restarted", style="bold red"))
+            action = "restarted (approved)"
+
+    # HISTORY (queued; written in batches by a background thread)
+    from history import shared_history, signature
+    shared_history.record(
+        signature(issue, events[-1] if events else "", names=(pod_name,)),
+        issue,
+        root_cause=reasoning.get("root_cause"),
+        action=action,
+        latency=latency,
+        source="k8s-agent",
+        response=json.dumps(reasoning),
+    )
 
 # ============================================================
-# CLI ENTRY POINT
+# MULTI-CLUSTER SCAN (FAN-OUT)
 # ============================================================
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python kubernetes_agent_v1.py <namespace> <pod-name>")
-        sys.exit(1)
+_registry = None
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        from clusters import ClusterRegistry
+        _registry = ClusterRegistry()
+    return _registry
+
+
+def unhealthy_pods(context, namespace=None):
+    api = get_registry().core_v1(context)
+    if namespace:
+        pods = api.list_namespaced_pod(namespace, _request_timeout=CLUSTER_TIMEOUT)
+    else:
+        pods = api.list_pod_for_all_namespaces(_request_timeout=CLUSTER_TIMEOUT)
+
+    rows = []
+    for p in pods.items:
+        if p.status.phase == "Succeeded":
+            continue            # completed Job pods: rule_engine would call them "Error"
+        issue = rule_engine(p)
+        if issue not in HEALTHY:
+            rows.append((p.metadata.namespace, p.metadata.name, issue))
+    return rows
+
+
+@traced("agent.scan_clusters", kind="agent")
+def scan_clusters(namespace=None):
+    from clusters import fan_out, merge_rows
+    from rich.table import Table
+
+    start = time.perf_counter()
+    results = fan_out(get_registry().contexts(), lambda ctx: unhealthy_pods(ctx, namespace), timeout=CLUSTER_TIMEOUT)
+    wall = time.perf_counter() - start
+    rows, errors = merge_rows(results, lambda value: value)
+
+    with span("agent.render", kind="render"):
+        slowest = max(results, key=lambda r: r.seconds, default=None)
+        table = Table(
+            title="Unhealthy Pods – All Clusters",
+            caption=f"{len(results)} clusters in {wall:.2f}s"
+                    + (f" (slowest: {slowest.cluster} {slowest.seconds:.2f}s)" if slowest else ""),
+        )
+        table.add_column("Cluster", style="magenta")
+        table.add_column("Namespace", style="cyan")
+        table.add_column("Pod", style="cyan")
+        table.add_column("Detected Issue", style="red")
+        for row in sorted(rows):
+            table.add_row(*row)
+        for cluster, error in errors:
+            table.add_row(cluster, "-", "-", f"[yellow]unreachable: {error}[/yellow]")
+        console().print(table)
+    return rows, errors
 
-    ns = sys.argv[1]
-    pod = sys.argv[2]
+# ============================================================
+# WARM DAEMON (UNIX SOCKET)
+# ============================================================
+
+def kube_identity():
+    """(kubeconfig files, current context) as kubectl would resolve them, without importing kubernetes."""
+    import re
+    files = os.environ.get("KUBECONFIG") or os.path.expanduser("~/.kube/config")
+    files = [os.path.abspath(f) for f in files.split(os.pathsep) if f]
+    context = None
+    for path in files:
+        try:
+            with open(path) as f:
+                match = re.search(r'^[\s{]*"?current-context"?\s*:\s*"?([^"\s,}]+)', f.read(), re.M)
+        except OSError:
+            continue
+        if match:
+            context = match.group(1)
+            break
+    return {"kubeconfig": files, "context": context}
+
+
+def private_dir(path):
+    """True if the socket's directory belongs to us and nobody else can write to it."""
+    try:
+        st = os.lstat(os.path.dirname(path))
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def serve_daemon(path=AGENT_SOCKET):
+    """Pre-load clients once, then serve diagnose requests from CLI invocations (one thread each)."""
+    import io
+    import socketserver
+    from rich.console import Console
+
+    identity = kube_identity()      # the clients below are bound to this cluster
+    get_v1()
+    get_llm()
+
+    class DiagnoseHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline())
+            if request.get("identity") != identity:
+                self.wfile.write(json.dumps({"mismatch": identity}).encode() + b"\n")
+                return
+            buffer = io.StringIO()
+            out = Console(file=buffer, force_terminal=request.get("tty", False), width=request.get("width", 100))
+            code = 0
+            try:
+                diagnose(request["namespace"], request["pod"], out)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                out.print(f"[red]{type(e).__name__}: {e}[/red]")
+                code = 1
+            try:
+                self.wfile.write(json.dumps({"output": buffer.getvalue(), "exit": code}).encode() + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass        # client gave up waiting; the diagnosis itself has run
+
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if not private_dir(path):
+        console().print(f"[red]{os.path.dirname(path)} is not a private directory; refusing to listen there[/red]")
+        return 1
+    if os.path.exists(path):
+        os.unlink(path)
+    old_umask = os.umask(0o177)     # socket is created 0600, no window with wider permissions
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, DiagnoseHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    console().print(f"[green]Kubernetes agent daemon listening on {path}[/green]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def try_daemon(namespace, pod, path=AGENT_SOCKET):
+    """Run the request in a warm daemon if one is listening; returns exit code or None."""
+    import socket
+
+    if MODE == "APPROVE" or not os.path.exists(path) or not private_dir(path):
+        return None     # approvals need this terminal's stdin
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(DAEMON_TIMEOUT)
+    columns = os.get_terminal_size().columns if sys.stdout.isatty() else 100
+    request = {"namespace": namespace, "pod": pod, "tty": sys.stdout.isatty(), "width": columns,
+               "identity": kube_identity()}
+    with sock:
+        try:
+            sock.connect(path)
+            f = sock.makefile("rwb")
+            f.write(json.dumps(request).encode() + b"\n")
+            f.flush()
+        except OSError:
+            return None     # no daemon listening: run locally
+        # delivered: the daemon runs it, so never run it again here
+        try:
+            with f:
+                reply = json.loads(f.readline())
+        except (OSError, ValueError) as e:
+            print(f"No answer from the daemon ({type(e).__name__}); the request may still complete there",
+                  file=sys.stderr)
+            return 1
+    if "mismatch" in reply:
+        print(f"Daemon serves context {reply['mismatch']['context']!r}, "
+              f"not {request['identity']['context']!r}; running locally", file=sys.stderr)
+        return None
+    sys.stdout.write(reply["output"])
+    return reply["exit"]
+
+# ============================================================
+# CLI ENTRY POINT
+# ============================================================
+
+def main(argv):
+    if argv[1:2] == ["--daemon"]:
+        return serve_daemon()
+
+    if argv[1:2] == ["--all-clusters"] and len(argv) <= 3:
+        _, errors = scan_clusters(argv[2] if len(argv) == 3 else None)
+        return 1 if errors else 0
+
+    if len(argv) != 3:
+        print("Usage: python kubernetes_agent_v2.py <namespace> <pod-name>")
+        print("       python kubernetes_agent_v2.py --all-clusters [namespace]")
+        print("       python kubernetes_agent_v2.py --daemon")
+        return 1
+
+    ns = argv[1]
+    pod = argv[2]
+    code = try_daemon(ns, pod)
+    if code is not None:
+        return code
     diagnose(ns, pod)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
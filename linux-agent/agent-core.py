@@ -1,9 +1,27 @@
+import os
+import sys
 import subprocess
 import json
 import re
+import shlex
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)           # result_cache, also when loaded by path from elsewhere
+sys.path.append(os.path.join(HERE, "..", "shared"))
+from telemetry import span
+from result_cache import shared_cache
+from clusters import fan_out
+
+# STATUS shows the reason, not the phase: match substrings (Init:CrashLoopBackOff,
+# CreateContainerConfigError, ...) and the reasons of phase-Failed pods
+FAILED_STATES = ("Failed", "CrashLoopBackOff", "Error", "Evicted", "OOMKilled", "ContainerStatusUnknown")
+CLUSTER_TIMEOUT = 10    # seconds per cluster for "... all clusters" queries
 
 class KubernetesAgent:
-    def __init__(self):
+    def __init__(self, cache=None):
+        # read-only listings are shared across sessions, invalidated by watches
+        self.cache = shared_cache if cache is None else cache     # an empty cache is falsy
+
         # conversational context
         self.context = {
             "namespace": "default",
@@ -16,9 +34,21 @@ class KubernetesAgent:
     # MAIN ENTRY
     # -----------------------------
     def handle(self, user_input: str, confirm: bool = False):
+        with span("chat.handle", kind="agent"):
+            return self._route(user_input, confirm)
+
+    def _route(self, user_input, confirm):
         user_input = user_input.lower().strip()
 
         # ROUTING
+        if "all cluster" in user_input:
+            if "failed pod" in user_input:
+                return self.all_clusters("kubectl get pods --all-namespaces", failed_only=True)
+            if "service" in user_input:
+                return self.all_clusters("kubectl get svc --all-namespaces")
+            if "pod" in user_input:
+                return self.all_clusters("kubectl get pods --all-namespaces")
+
         if "failed pod" in user_input or "failed pods" in user_input:
             return self.failed_pods()
 
@@ -48,33 +78,53 @@ class KubernetesAgent:
     # -----------------------------
     # KUBECTL EXECUTOR
     # -----------------------------
-    def run(self, command):
+    def run(self, command, timeout=None, check=False):
+        with span("kubectl.run", kind="api", command=command):
+            try:
+                result = subprocess.check_output(
+                    ["bash", "-c", command],
+                    stderr=subprocess.STDOUT,
+                    timeout=timeout
+                ).decode()
+                return result
+            except subprocess.CalledProcessError as e:
+                if check:
+                    raise RuntimeError(e.output.decode().strip())
+                return e.output.decode()
+            except subprocess.TimeoutExpired:
+                if check:
+                    raise
+                return f"Timed out after {timeout}s: {command}"
+
+    def cached(self, kind, command):
+        # only exit-0 output is cached; a kubectl error is returned once, never stored
         try:
-            result = subprocess.check_output(
-                ["bash", "-c", command],
-                stderr=subprocess.STDOUT
-            ).decode()
-            return result
-        except subprocess.CalledProcessError as e:
-            return e.output.decode()
+            return self.cache.get(kind, command, lambda cmd: self.run(cmd, check=True))
+        except RuntimeError as e:
+            return f"{e}\n"
 
     # -----------------------------
     # FAILED PODS (SMART)
     # -----------------------------
-    def failed_pods(self):
-        cmd = (
-            "kubectl get pods --all-namespaces "
-            "--field-selector=status.phase=Failed"
-        )
-        output = self.run(cmd)
+    @staticmethod
+    def failed_lines(listing):
+        """Header plus rows of an all-namespaces pod listing whose STATUS is failed."""
+        lines = listing.strip().splitlines()
+        failed = [
+            line for line in lines[1:]
+            if len(line.split()) > 3 and any(state in line.split()[3] for state in FAILED_STATES)
+        ]
+        return lines[:1], failed
 
-        # If none failed, check CrashLoopBackOff
-        if "No resources found" in output:
-            cmd = (
-                "kubectl get pods --all-namespaces | "
-                "grep -E 'CrashLoopBackOff|Error'"
-            )
-            output = self.run(cmd)
+    def failed_pods(self):
+        # One (cached) listing, filtered on the STATUS column
+        listing = self.cached("pods", "kubectl get pods --all-namespaces")
+        if listing.startswith("No resources found"):
+            return "No failed pods found."
+        if not listing.startswith("NAMESPACE"):
+            return listing          # kubectl error, not a table
+        header, failed = self.failed_lines(listing)
+        output = "\n".join(header + failed) + "\n" if failed else ""
 
         # Capture first failing pod for context
         lines = output.strip().splitlines()
@@ -85,6 +135,43 @@ class KubernetesAgent:
 
         return output or "No failed pods found."
 
+    # -----------------------------
+    # ALL CLUSTERS (PARALLEL FAN-OUT)
+    # -----------------------------
+    def cluster_contexts(self):
+        return self.run("kubectl config get-contexts -o name", check=True).split()
+
+    def all_clusters(self, command, failed_only=False):
+        contexts = self.cluster_contexts()
+        per_cluster = command.replace("kubectl", "kubectl --context {ctx}", 1)
+        results = fan_out(
+            contexts,
+            lambda ctx: self.run(per_cluster.format(ctx=shlex.quote(ctx)), timeout=CLUSTER_TIMEOUT, check=True),
+            timeout=CLUSTER_TIMEOUT,
+        )
+
+        width = max(len("CLUSTER"), *(len(c) for c in contexts)) + 3
+        header, rows = None, []
+        for result in results:
+            if not result.ok:
+                rows.append(f"{result.cluster:<{width}}<unreachable: {result.error}>")
+                continue
+            if not result.value.startswith("NAMESPACE"):
+                continue            # e.g. "No resources found": nothing to list, and not a header
+            if failed_only:
+                head, lines = self.failed_lines(result.value)
+            else:
+                all_lines = result.value.strip().splitlines()
+                head, lines = all_lines[:1], all_lines[1:]
+            header = head
+            rows.extend(f"{result.cluster:<{width}}{line}" for line in lines)
+
+        if not rows:
+            return "No failed pods found in any cluster." if failed_only else "No resources found in any cluster."
+        top = [f"{'CLUSTER':<{width}}{header[0]}"] if header else []
+        wall = max((r.seconds for r in results), default=0)
+        return "\n".join(top + rows) + f"\n\n({len(results)} clusters, slowest {wall:.2f}s)\n"
+
     # -----------------------------
     # POD LOGS (CONTEXT AWARE)
     # -----------------------------
@@ -132,7 +219,7 @@ class KubernetesAgent:
         else:
             cmd = f"kubectl get pods -n {self.context['namespace']}"
 
-        output = self.run(cmd)
+        output = self.cached("pods", cmd)
         return output
 
     # -----------------------------
@@ -144,7 +231,7 @@ class KubernetesAgent:
         else:
             cmd = f"kubectl get svc -n {self.context['namespace']}"
 
-        return self.run(cmd)
+        return self.cached("services", cmd)
 
     # -----------------------------
     # CREATE NGINX POD (SAFE)
@@ -156,7 +243,9 @@ class KubernetesAgent:
             "--restart=Never "
             "-n default"
         )
-        return self.run(cmd)
+        output = self.run(cmd)
+        self.cache.invalidate("pods")
+        return output
 
     # -----------------------------
     # DELETE POD (CONFIRM REQUIRED)
@@ -173,4 +262,6 @@ class KubernetesAgent:
             return f"CONFIRM REQUIRED: delete pod {pod} in namespace {ns}"
 
         cmd = f"kubectl delete pod {pod} -n {ns}"
-        return self.run(cmd)
+        output = self.run(cmd)
+        self.cache.invalidate("pods")
+        return output
@@ -4,7 +4,14 @@ import subprocess
 import threading
 import time
 import os
-from flask import Flask, render_template, request, redirect
+import sys
+from flask import Flask, render_template, request, redirect, jsonify
+from proc_table import ProcessTable, TOP_N
+from load_engine import LoadEngine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import gauge, histogram, instrument_flask, span
+from history import shared_history, signature
 
 # ---------------- CONFIG ----------------
 OLLAMA_URL = "http://localhost:11434/api/generate"
@@ -12,14 +19,29 @@ MODEL = "llama3.1:8b"          # Reliable for strict output
 APPROVE_PASSWORD = "admin123"
 
 app = Flask(__name__)
+instrument_flask(app)
 
 latest_metrics = {}
+process_table = ProcessTable()
+load_engine = LoadEngine()
 latest_ai_response = ""
 last_action_status = ""
 last_action_output = ""
 
+# ---------------- TELEMETRY ----------------
+gauge("system_metric", "Latest sampled host metrics",
+      callback=lambda: {(("metric", k),): v for k, v in latest_metrics.items() if k != "top"})
+gauge("top_process_cpu_percent", "CPU of the heaviest processes (100 = one core)",
+      callback=lambda: {(("name", p["name"]), ("pid", p["pid"])): p["cpu"] for p in latest_metrics.get("top", [])})
+LLM_PROMPT_EVAL = histogram("llm_prompt_eval_seconds", "Ollama prompt evaluation time")
+LLM_GENERATION = histogram("llm_generation_seconds", "Ollama token generation time")
+
 # ---------------- METRICS ----------------
 def collect_metrics():
+    with span("metrics.collect", kind="collector"):
+        return _collect_metrics()
+
+def _collect_metrics():
     load1, _, _ = os.getloadavg()
     cores = psutil.cpu_count()
 
@@ -27,6 +49,9 @@ def collect_metrics():
     mem = psutil.virtual_memory()
     disk = psutil.disk_usage("/")
 
+    # per-process deltas since the previous sample (no ps fork needed)
+    process_table.sample()
+
     return {
         "cpu": round(cpu, 1),
         "load": round(load1, 2),
@@ -34,6 +59,7 @@ def collect_metrics():
         "memory": round(mem.percent, 1),
         "mem_free": round(mem.available / (1024 * 1024), 1),
         "disk": round(disk.percent, 1),
+        "top": process_table.top(TOP_N),
     }
 
 # ---------------- SEVERITY ----------------
@@ -63,12 +89,20 @@ def decide_action(m):
     if m["disk"] > 90:
         return "df -h", "Disk nearing capacity"
     if m["cpu"] > 75:
+        if m.get("top"):
+            p = m["top"][0]
+            return "NONE", f"High CPU usage, top offender {p['name']} (pid {p['pid']}) at {p['cpu']}%"
         return "ps aux --sort=-%cpu | head", "High CPU usage"
     if m["load"] > m["cores"]:
         return "uptime", "Load exceeds CPU cores"
     return "NONE", "System operating normally"
 
 # ---------------- AI ----------------
+def format_top(top):
+    if not top:
+        return "unavailable"
+    return "\n".join(f"{p['name']} pid={p['pid']} cpu={p['cpu']}% rss={p['rss_mb']}MB" for p in top)
+
 def ask_ai(m):
     command, reason = decide_action(m)
     severity = calculate_severity(m)
@@ -89,18 +123,29 @@ LOAD={m['load']}
 CORES={m['cores']}
 MEMORY={m['memory']}%
 DISK={m['disk']}%
+TOP_PROCESSES:
+{format_top(m.get("top"))}
 DECISION:
 STATUS={severity}
 COMMAND={command}
 REASON={reason}
 """
     try:
-        r = requests.post(
-            OLLAMA_URL,
-            json={"model": MODEL, "prompt": prompt, "stream": False},
-            timeout=120,
-        )
-        return sanitize_ai(r.json().get("response", ""))
+        with span("llm.ask_ai", kind="llm", model=MODEL) as s:
+            r = requests.post(
+                OLLAMA_URL,
+                json={"model": MODEL, "prompt": prompt, "stream": False},
+                timeout=120,
+            )
+            body = r.json()
+            # Ollama reports its own phase timings in nanoseconds
+            if "prompt_eval_duration" in body:
+                LLM_PROMPT_EVAL.observe(body["prompt_eval_duration"] / 1e9, model=MODEL)
+                s.set_attribute("prompt_eval_ms", body["prompt_eval_duration"] / 1e6)
+            if "eval_duration" in body:
+                LLM_GENERATION.observe(body["eval_duration"] / 1e9, model=MODEL)
+                s.set_attribute("generation_ms", body["eval_duration"] / 1e6)
+        return sanitize_ai(body.get("response", ""))
     except Exception:
         return "STATUS: ERROR\nREASON: AI unavailable\nCOMMAND: NONE"
 
@@ -113,24 +158,75 @@ def sanitize_ai(text):
                 out[key] = line.split(":", 1)[1].strip()
     return f"STATUS: {out['STATUS'] or 'UNKNOWN'}\nREASON: {out['REASON'] or 'No AI response'}\nCOMMAND: {out['COMMAND'] or 'NONE'}"
 
+def extract_status(text):
+    for line in text.splitlines():
+        if line.startswith("STATUS:"):
+            return line.split("STATUS:")[1].strip().upper()
+    return "UNKNOWN"
+
 def extract_command(text):
     for line in text.splitlines():
         if line.startswith("COMMAND:"):
             return line.split("COMMAND:")[1].strip()
     return "NONE"
 
+def extract_reason(text):
+    for line in text.splitlines():
+        if line.startswith("REASON:"):
+            return line.split("REASON:")[1].strip()
+    return ""
+
 # ---------------- THREADS ----------------
+ALERT_STATES = ("WARNING", "MAJOR", "CRITICAL")
+
+def flagged_kinds(m):
+    """Load kinds the metrics stage currently flags (same thresholds as decide_action)."""
+    kinds = set()
+    if m["cpu"] > 75 or m["load"] > m["cores"]:
+        kinds.add("cpu")
+    if m["memory"] > 85:
+        kinds.add("memory")
+    if m["disk"] > 90:
+        kinds.add("disk")
+    return kinds
+
 def monitor_loop():
     global latest_metrics
     while True:
-        latest_metrics = collect_metrics()
+        try:
+            latest_metrics = collect_metrics()
+            load_engine.reap()
+            load_engine.observe("metrics", flagged_kinds(latest_metrics))
+        except Exception as e:
+            print(f"monitor_loop: {type(e).__name__}: {e}", file=sys.stderr)   # keep sampling
         time.sleep(2)
 
+def record_answer(m, answer, latency):
+    """Keep alerting answers in the shared incident history (queued, never blocks)."""
+    status = extract_status(answer)
+    if status not in ALERT_STATES:
+        return                      # INFO, and ERROR/UNKNOWN when the model is unavailable
+    _, reason = decide_action(m)
+    shared_history.record(
+        signature(status, reason),
+        status,
+        root_cause=extract_reason(answer),
+        action=f"proposed: {extract_command(answer)}",
+        latency=latency,
+        source="linux-agent",
+        response=answer,
+    )
+
 def ai_loop():
     global latest_ai_response
     while True:
         if latest_metrics:
-            latest_ai_response = ask_ai(latest_metrics)
+            m = latest_metrics
+            started = time.perf_counter()
+            latest_ai_response = ask_ai(m)
+            record_answer(m, latest_ai_response, time.perf_counter() - started)
+            if extract_status(latest_ai_response) in ALERT_STATES:
+                load_engine.observe("ai", flagged_kinds(m))
         time.sleep(4)
 
 # ---------------- SAFE EXECUTION ----------------
@@ -151,27 +247,63 @@ def execute_action():
         last_action_output = "Blocked unsafe command."
         return
     try:
-        r = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+        with span("action.execute", kind="action", command=cmd):
+            r = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
         last_action_output = f"$ {cmd}\n\n{r.stdout}"
     except Exception as e:
         last_action_output = str(e)
 
 # ---------------- FAULT INJECTION ----------------
+# Managed, time-bounded load (see load_engine.py). Query parameters:
+#   duration (s, default 60), ramp (s, default 0)
+#   cpu: percent (per core, default 100), cores (default 1)
+#   memory / disk: mb (default 512 / 1024)
+def inject(kind, intensity, **extra):
+    try:
+        load_engine.start(
+            kind,
+            intensity,
+            duration=request.args.get("duration", 60, type=float),
+            ramp=request.args.get("ramp", 0, type=float),
+            **extra,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 429
+    return redirect("/")
+
 @app.route("/inject/cpu")
 def inject_cpu():
-    subprocess.Popen("yes > /dev/null", shell=True)
-    return redirect("/")
+    return inject("cpu", request.args.get("percent", 100, type=int), cores=request.args.get("cores", 1, type=int))
 
 @app.route("/inject/memory")
 def inject_memory():
-    subprocess.Popen("stress --vm 1 --vm-bytes 512M", shell=True)
-    return redirect("/")
+    return inject("memory", request.args.get("mb", 512, type=int))
 
 @app.route("/inject/disk")
 def inject_disk():
-    subprocess.Popen("dd if=/dev/zero of=/tmp/fill bs=1M count=1024", shell=True)
+    return inject("disk", request.args.get("mb", 1024, type=int))
+
+@app.route("/inject/stop")
+def inject_stop():
+    load_engine.stop_all()
     return redirect("/")
 
+@app.route("/inject/status")
+def inject_status():
+    return jsonify(load_engine.status())
+
+# ---------------- HISTORY ----------------
+# /history?hours=24&limit=10 : recurring signatures and the latest answers
+@app.route("/history")
+def incident_history():
+    hours = request.args.get("hours", 24, type=float)
+    limit = request.args.get("limit", 10, type=int)
+    return jsonify({
+        "top": shared_history.top_signatures(hours, limit),
+        "recent": shared_history.recent(limit, source="linux-agent"),
+        "store": shared_history.stats(),
+    })
+
 # ---------------- ROUTES ----------------
 @app.route("/")
 def dashboard():
@@ -182,6 +314,7 @@ def dashboard():
         output=last_action_output,
         status=last_action_status,
         severity=calculate_severity(latest_metrics) if latest_metrics else "INFO",
+        injections=load_engine.status(),
     )
 
 @app.route("/approve", methods=["POST"])
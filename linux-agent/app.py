@@ -1,8 +1,47 @@
-from flask import Flask, request, jsonify, render_template
+import importlib.util
+import os
+import secrets
+import sys
+from flask import Flask, request, jsonify, render_template, session
+
+# the agent lives in agent-core.py, which is not importable by name
+HERE = os.path.dirname(os.path.abspath(__file__))
+if "agent_core" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("agent_core", os.path.join(HERE, "agent-core.py"))
+    sys.modules["agent_core"] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules["agent_core"])
 from agent_core import KubernetesAgent
+from result_cache import shared_cache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import instrument_flask
+
+SESSION_TTL = 1800          # seconds a chat context stays valid
+SECRET_FILE = os.environ.get("CHAT_SECRET_FILE", os.path.expanduser("~/.k8s-chat-secret"))
+
+def secret_key():
+    """CHAT_SECRET_KEY, else a key file shared by every worker process (created once, 0600)."""
+    if os.environ.get("CHAT_SECRET_KEY"):
+        return os.environ["CHAT_SECRET_KEY"]
+    try:
+        fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(SECRET_FILE) as f:
+            return f.read().strip()
+    key = secrets.token_hex(32)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    return key
 
 app = Flask(__name__)
-agent = KubernetesAgent()
+app.secret_key = secret_key()
+app.permanent_session_lifetime = SESSION_TTL
+instrument_flask(app)
+
+# The conversational context (namespace, pod, deployment, resource) travels in
+# Flask's signed session cookie, so any worker process or thread can serve any
+# request of a session; the agent itself is stateless apart from it.
+CONTEXT_KEYS = ("namespace", "pod", "deployment", "resource")
 
 @app.route("/", methods=["GET"])
 def home():
@@ -17,11 +56,15 @@ def chat():
                 "error": "Invalid request. Expected JSON with 'message'"
             }), 400
 
-        user_message = data["message"]
-        output = agent.handle(user_message)
+        agent = KubernetesAgent()
+        agent.context.update({k: v for k, v in session.get("context", {}).items() if k in CONTEXT_KEYS})
+        output = agent.handle(data["message"])
 
+        session.permanent = True
+        session["context"] = {k: agent.context.get(k) for k in CONTEXT_KEYS}
         return jsonify({
-            "response": output
+            "response": output,
+            "context": session["context"]
         })
 
     except Exception as e:
@@ -30,5 +73,9 @@ def chat():
             "details": str(e)
         }), 500
 
+@app.route("/cache", methods=["GET"])
+def cache_stats():
+    return jsonify(shared_cache.stats())
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
@@ -0,0 +1,78 @@
+# bench_proc_table.py
+# Sampling cost of ProcessTable with many processes.
+#
+# Builds a synthetic /proc with N processes (default 5000) whose CPU ticks
+# advance between samples, then times ProcessTable.sample() + top(). Also
+# times one sample of the real /proc for reference.
+#
+# Usage:
+#   python bench_proc_table.py [--procs 5000] [--samples 20]
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from proc_table import ProcessTable
+
+STAT = "{pid} ({name}) R 1 {pid} {pid} 0 -1 4194304 100 0 0 0 {utime} {stime} 0 0 20 0 1 0 {start} 1000000 {rss} 18446744073709551615 0 0 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0\n"
+
+
+def write_stats(root, procs, tick):
+    for pid, (name, weight) in procs.items():
+        busy = int(tick * weight)
+        with open(os.path.join(root, str(pid), "stat"), "w") as f:
+            f.write(STAT.format(pid=pid, name=name, utime=busy, stime=busy // 10, start=pid * 7, rss=2560 + pid % 1000))
+
+
+def build_proc(n, seed=7):
+    rng = random.Random(seed)
+    root = tempfile.mkdtemp(prefix="fakeproc-")
+    procs = {}
+    for pid in range(100, 100 + n):
+        os.mkdir(os.path.join(root, str(pid)))
+        procs[pid] = ("worker" if pid % 50 else "yes", rng.random() * (100 if pid % 50 == 0 else 2))
+    os.mkdir(os.path.join(root, "self"))    # non-numeric entries are skipped
+    write_stats(root, procs, 0)
+    return root, procs
+
+
+def time_samples(table, samples, between=None):
+    costs = []
+    for i in range(samples):
+        if between:
+            between(i + 1)
+        start = time.perf_counter()
+        table.sample()
+        table.top()
+        costs.append((time.perf_counter() - start) * 1000)
+    return costs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ProcessTable sampling benchmark")
+    parser.add_argument("--procs", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    root, procs = build_proc(args.procs)
+    try:
+        table = ProcessTable(proc_root=root)
+        table.sample()
+        costs = time_samples(table, args.samples, lambda tick: write_stats(root, procs, tick))
+        print(f"synthetic /proc, {args.procs} processes, {table.open_handles} cached handles")
+        print(f"  sample+top: median {statistics.median(costs):.2f} ms, max {max(costs):.2f} ms "
+              f"({statistics.median(costs) * 1000 / args.procs:.2f} us/process)")
+        print(f"  top: {table.top(3)}")
+        table.close()
+    finally:
+        shutil.rmtree(root)
+
+    real = ProcessTable()
+    real.sample()
+    costs = time_samples(real, args.samples)
+    print(f"real /proc, {len(real.procs)} processes: median {statistics.median(costs):.2f} ms")
+    real.close()
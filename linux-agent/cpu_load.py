@@ -1,13 +1,27 @@
 # cpu_load.py
+# Bounded CPU load from the command line, using the same engine as /inject/cpu.
+#   python cpu_load.py                                   # 100% on every core for 60 s
+#   python cpu_load.py --percent 40 --cores 2 --duration 60 --ramp 10
+import argparse
 import multiprocessing
 import time
 
-def burn_cpu():
-    while True:
-        pass  # infinite loop
+from load_engine import LoadEngine
 
 if __name__ == "__main__":
-    cores = multiprocessing.cpu_count()
-    print(f"Spawning {cores} processes to use CPU")
-    for _ in range(cores):
-        multiprocessing.Process(target=burn_cpu).start()
+    parser = argparse.ArgumentParser(description="Generate bounded CPU load")
+    parser.add_argument("--percent", type=int, default=100, help="load per core (1-100)")
+    parser.add_argument("--cores", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--ramp", type=float, default=0, help="seconds to ramp up and down")
+    args = parser.parse_args()
+
+    engine = LoadEngine()
+    job = engine.start("cpu", args.percent, duration=args.duration, ramp=args.ramp, cores=args.cores)
+    print(f"Loading {job.params['cores']} cores at {job.params['intensity']}% for {job.params['duration']}s (Ctrl-C stops)")
+    try:
+        while job.alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        engine.stop_all()
+    engine.reap()
@@ -1,6 +1,11 @@
+import os
+import sys
 import subprocess
 from mcp.server.fastmcp import FastMCP
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import span
+
 mcp = FastMCP("kubernetes-universal-agent")
 
 def run(cmd):
@@ -21,7 +26,8 @@ def kubectl(command: str):
       delete pod nginx -n default
     """
     full_cmd = ["kubectl"] + command.split()
-    return run(full_cmd)
+    with span("mcp.kubectl", kind="api", command=command):
+        return run(full_cmd)
 
 if __name__ == "__main__":
     mcp.run()
@@ -0,0 +1,270 @@
+# load_engine.py
+# Managed load injection for the fault-injection lab.
+#
+# Every injection is a Job with an intensity ramp (ramp up → hold → ramp down)
+# and a hard duration. The number of concurrent jobs and the total cores / MiB
+# per kind are capped as well, so injections cannot be stacked without bound.
+# Jobs run in child processes that the engine tracks, reaps and can stop at
+# any time; disk jobs remove their file on exit.
+#
+# The app reports what its pipeline noticed through observe(), and each job
+# records how long the metrics stage and the AI stage took to flag it, which
+# makes "how fast do we react" a repeatable measurement.
+#
+#   engine = LoadEngine()
+#   engine.start("cpu", intensity=40, cores=2, duration=60, ramp=10)
+#   engine.observe("metrics", {"cpu"})        # from the monitor loop
+#   engine.status()
+
+import atexit
+import itertools
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+
+MAX_DURATION = 600          # seconds
+MAX_MEMORY_MB = 4096
+MAX_DISK_MB = 4096
+MAX_ACTIVE_JOBS = 4
+# Totals across all running jobs; start() rejects anything beyond them
+MAX_TOTAL_CORES = multiprocessing.cpu_count()
+MAX_TOTAL_MEMORY_MB = MAX_MEMORY_MB
+MAX_TOTAL_DISK_MB = MAX_DISK_MB
+TICK = 0.1                  # CPU duty-cycle period / ramp resolution
+HISTORY = 50
+
+# ============================================================
+# RAMP PROFILE
+# ============================================================
+
+def ramp_level(elapsed, duration, ramp):
+    """Fraction (0-1) of the target intensity at `elapsed` seconds."""
+    if elapsed >= duration:
+        return 0.0
+    if ramp <= 0:
+        return 1.0
+    ramp = min(ramp, duration / 2)
+    if elapsed < ramp:
+        return elapsed / ramp
+    if elapsed > duration - ramp:
+        return (duration - elapsed) / ramp
+    return 1.0
+
+# ============================================================
+# CHILD PROCESSES
+# ============================================================
+
+def _exit_on_term(*_):
+    raise SystemExit(0)
+
+
+def _child_setup(name):
+    """Exit cleanly on SIGTERM and show up as `name` in /proc (and on the dashboard)."""
+    signal.signal(signal.SIGTERM, _exit_on_term)
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(15, name.encode(), 0, 0, 0)     # PR_SET_NAME
+    except (OSError, AttributeError):
+        pass
+
+
+def cpu_worker(percent, duration, ramp):
+    """Duty-cycle busy loop on one core: busy `percent`% of every TICK."""
+    _child_setup("load-cpu")
+    start = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - start
+        if elapsed >= duration:
+            return
+        busy = TICK * percent / 100 * ramp_level(elapsed, duration, ramp)
+        tick_start = time.monotonic()
+        while time.monotonic() - tick_start < busy:
+            pass
+        time.sleep(max(0.0, TICK - (time.monotonic() - tick_start)))
+
+
+def memory_worker(mb, duration, ramp):
+    """Hold up to `mb` MiB of touched memory following the ramp."""
+    _child_setup("load-memory")
+    chunks = []
+    start = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - start
+        if elapsed >= duration:
+            return
+        want = int(mb * ramp_level(elapsed, duration, ramp))
+        while len(chunks) < want:
+            chunks.append(bytearray(b"\x01" * (1024 * 1024)))
+        del chunks[want:]
+        time.sleep(TICK)
+
+
+def disk_worker(mb, duration, ramp, path):
+    """Grow a file towards `mb` MiB following the ramp; always removes it."""
+    _child_setup("load-disk")
+    block = b"\0" * (1024 * 1024)
+    start = time.monotonic()
+    try:
+        with open(path, "wb") as f:
+            written = 0
+            while True:
+                elapsed = time.monotonic() - start
+                if elapsed >= duration:
+                    return
+                want = int(mb * ramp_level(elapsed, duration, ramp))
+                while written < want:
+                    f.write(block)
+                    written += 1
+                if written > want:
+                    f.truncate(want * 1024 * 1024)
+                    f.seek(0, os.SEEK_END)
+                    written = want
+                f.flush()
+                time.sleep(TICK)
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+# ============================================================
+# ENGINE
+# ============================================================
+
+class Job:
+    def __init__(self, job_id, kind, params):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.procs = []
+        self.path = None
+        self.started = time.time()
+        self.started_mono = time.monotonic()
+        self.ended = None
+        self.detected = {}          # stage -> seconds after start
+
+    def alive(self):
+        return any(p.is_alive() for p in self.procs)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "started": self.started,
+            "ended": self.ended,
+            "running": self.ended is None,
+            "pids": [p.pid for p in self.procs],
+            "detection_latency_s": dict(self.detected),
+        }
+
+
+class LoadEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.active = {}
+        self.history = deque(maxlen=HISTORY)
+        atexit.register(self.stop_all)
+
+    def start(self, kind, intensity, duration=60, ramp=0, cores=1):
+        """intensity: CPU % per core, or MiB for memory/disk."""
+        duration = max(1, min(float(duration), MAX_DURATION))
+        ramp = max(0.0, float(ramp))
+        job = Job(next(self._ids), kind, {"intensity": intensity, "duration": duration, "ramp": ramp})
+
+        if kind == "cpu":
+            percent = max(1, min(int(intensity), 100))
+            cores = max(1, min(int(cores), multiprocessing.cpu_count()))
+            job.params.update(intensity=percent, cores=cores)
+            targets = [(cpu_worker, (percent, duration, ramp)) for _ in range(cores)]
+        elif kind == "memory":
+            mb = max(1, min(int(intensity), MAX_MEMORY_MB))
+            job.params["intensity"] = mb
+            targets = [(memory_worker, (mb, duration, ramp))]
+        elif kind == "disk":
+            mb = max(1, min(int(intensity), MAX_DISK_MB))
+            job.params["intensity"] = mb
+            job.path = os.path.join(tempfile.gettempdir(), f"load-engine-{os.getpid()}-{job.id}.fill")
+            targets = [(disk_worker, (mb, duration, ramp, job.path))]
+        else:
+            raise ValueError(f"unknown load kind: {kind}")
+
+        self.reap()
+        with self._lock:
+            self._check_limits(job)
+            for target, args in targets:
+                proc = multiprocessing.Process(target=target, args=args, daemon=True)
+                proc.start()
+                job.procs.append(proc)
+            self.active[job.id] = job
+        return job
+
+    def _check_limits(self, job):
+        """Reject a job that would exceed the job count or the per-kind totals (caller holds the lock)."""
+        if len(self.active) >= MAX_ACTIVE_JOBS:
+            raise ValueError(f"{len(self.active)} injections already running (max {MAX_ACTIVE_JOBS})")
+        same = [j for j in self.active.values() if j.kind == job.kind]
+        if job.kind == "cpu":
+            used, want, cap, unit = sum(j.params["cores"] for j in same), job.params["cores"], MAX_TOTAL_CORES, "cores"
+        elif job.kind == "memory":
+            used, want, cap, unit = sum(j.params["intensity"] for j in same), job.params["intensity"], MAX_TOTAL_MEMORY_MB, "MiB"
+        else:
+            used, want, cap, unit = sum(j.params["intensity"] for j in same), job.params["intensity"], MAX_TOTAL_DISK_MB, "MiB"
+        if used + want > cap:
+            raise ValueError(f"{job.kind}: {want} more {unit} would exceed the limit ({used} of {cap} {unit} in use)")
+
+    def reap(self):
+        """Join finished children and move completed jobs to history."""
+        with self._lock:
+            done = [job for job in self.active.values() if not job.alive()]
+            for job in done:
+                for proc in job.procs:
+                    proc.join(timeout=0)
+                job.ended = time.time()
+                del self.active[job.id]
+                self.history.append(job)
+        return done
+
+    def stop(self, job_id):
+        with self._lock:
+            job = self.active.get(job_id)
+        if job is None:
+            return False
+        for proc in job.procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in job.procs:
+            proc.join(timeout=2)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        if job.path and os.path.exists(job.path):
+            os.unlink(job.path)
+        self.reap()
+        return True
+
+    def stop_all(self):
+        with self._lock:
+            ids = list(self.active)
+        for job_id in ids:
+            self.stop(job_id)
+        return len(ids)
+
+    def observe(self, stage, flagged):
+        """Record first detection by `stage` ("metrics" / "ai") for active jobs of the flagged kinds."""
+        now = time.monotonic()
+        with self._lock:
+            for job in self.active.values():
+                if stage not in job.detected and (job.kind in flagged or "*" in flagged):
+                    job.detected[stage] = round(now - job.started_mono, 3)
+
+    def status(self):
+        self.reap()
+        with self._lock:
+            return {
+                "active": [job.as_dict() for job in self.active.values()],
+                "history": [job.as_dict() for job in reversed(self.history)],
+            }
@@ -0,0 +1,150 @@
+# load_test_sessions.py
+# Concurrency load test for the chat app's per-session context.
+#
+# Starts --workers app.py processes (threaded werkzeug servers on local
+# ports) and simulates N concurrent chat sessions against them. Each session
+# keeps its own cookie jar and sends consecutive requests to different
+# workers, round-robin, so a context that lived in one process would be lost.
+# Each session picks its own pod, then asks context-dependent questions
+# ("pod logs", "describe pod"); every answer must refer to that session's
+# pod, never another session's. kubectl is replaced by an echo of the
+# command so the test needs no cluster.
+#
+# Usage:
+#   python load_test_sessions.py [--sessions 500] [--rounds 5] [--workers 4]
+
+import argparse
+import http.cookiejar
+import importlib.util
+import json
+import multiprocessing
+import os
+import secrets
+import socket
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_app(kubectl_latency):
+    # app.py imports `agent_core`; the module lives in agent-core.py
+    spec = importlib.util.spec_from_file_location("agent_core", os.path.join(HERE, "agent-core.py"))
+    agent_core = importlib.util.module_from_spec(spec)
+    sys.modules["agent_core"] = agent_core
+    spec.loader.exec_module(agent_core)
+
+    def fake_run(self, command, **kwargs):
+        time.sleep(kubectl_latency)     # yield to other sessions mid-request
+        return f"$ {command}\n"
+    agent_core.KubernetesAgent.run = fake_run
+
+    sys.path.insert(0, HERE)
+    import app
+    return app.app
+
+
+def serve_worker(port, kubectl_latency):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)     # no per-request access log
+    make_server("127.0.0.1", port, load_app(kubectl_latency), threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, timeout=15):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def post(opener, url, message):
+    body = json.dumps({"message": message}).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with opener.open(req, timeout=30) as reply:
+            return reply.status, json.load(reply)
+    except urllib.error.HTTPError as e:
+        return e.code, {}
+
+
+def simulate(urls, session_no, rounds, latencies, failures):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    pod = f"pod-{session_no:04d}"
+    script = [(f"logs for pod {pod}", pod)]
+    script += [("pod logs", pod), ("describe pod", pod)] * rounds
+
+    for i, (message, expected) in enumerate(script):
+        url = urls[(session_no + i) % len(urls)]
+        start = time.perf_counter()
+        status, data = post(opener, url, message)
+        latencies.append(time.perf_counter() - start)
+        text = data.get("response", "")
+        if status != 200 or f" {expected} " not in text:
+            failures.append(f"session {session_no}: {message!r} -> {text.strip()!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent chat session load test")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4, help="app processes to spread requests over")
+    parser.add_argument("--kubectl-latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    # every worker must sign cookies with the same key
+    os.environ.setdefault("CHAT_SECRET_KEY", secrets.token_hex(32))
+    ports = [free_port() for _ in range(args.workers)]
+    procs = [multiprocessing.Process(target=serve_worker, args=(port, args.kubectl_latency), daemon=True)
+             for port in ports]
+    for p in procs:
+        p.start()
+    urls = [f"http://127.0.0.1:{port}/chat" for port in ports]
+    for port in ports:
+        wait_ready(f"http://127.0.0.1:{port}/cache")
+
+    latencies, failures = [], []
+    start_gate = threading.Barrier(args.sessions)
+
+    def worker(n):
+        start_gate.wait()
+        simulate(urls, n, args.rounds, latencies, failures)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.sessions)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    for p in procs:
+        p.terminate()
+
+    latencies.sort()
+    print(f"workers={args.workers} sessions={args.sessions} requests={len(latencies)} wall={elapsed:.2f}s "
+          f"throughput={len(latencies) / elapsed:.0f} req/s")
+    print(f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+
+    if failures:
+        for failure in failures[:20]:
+            print(f"FAIL {failure}")
+        print(f"{len(failures)} lost or cross-session context errors")
+        sys.exit(1)
+    print("OK: every session kept its own context on every worker")
@@ -0,0 +1,136 @@
+# proc_table.py
+# Incremental per-process CPU / RSS table fed by /proc/<pid>/stat deltas.
+#
+# - /proc/<pid>/stat handles stay open between samples and are re-read with
+#   pread(), so a sample costs one listdir plus one read per process.
+# - CPU% comes from utime+stime tick deltas between two samples (100% = one core).
+# - PID reuse is detected through the process start time.
+# - top() selects the N heaviest processes with a heap (O(n log N)).
+
+import heapq
+import os
+import resource
+import time
+
+TOP_N = 5
+
+
+def _handle_budget():
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return max(0, min(4096, soft // 2))     # leave room for the app's own sockets/files
+
+
+class Proc:
+    __slots__ = ("pid", "name", "fd", "start", "ticks", "cpu", "rss")
+
+    def __init__(self, pid, fd):
+        self.pid = pid
+        self.fd = fd
+        self.name = "?"
+        self.start = None
+        self.ticks = None
+        self.cpu = 0.0
+        self.rss = 0
+
+
+class ProcessTable:
+    def __init__(self, proc_root="/proc", max_handles=None):
+        self.proc_root = proc_root
+        self.max_handles = _handle_budget() if max_handles is None else max_handles
+        self.clk_tck = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.procs = {}
+        self.open_handles = 0
+        self.last_sample = None
+
+    def _read(self, pid, proc):
+        path = f"{self.proc_root}/{pid}/stat"
+        if proc is not None and proc.fd is not None:
+            return os.pread(proc.fd, 1024, 0), proc.fd
+        if self.open_handles < self.max_handles:
+            fd = os.open(path, os.O_RDONLY)
+            self.open_handles += 1
+            try:
+                return os.pread(fd, 1024, 0), fd
+            except OSError:
+                self._release(fd)           # exited between open and read
+                raise
+        with open(path, "rb") as f:
+            return f.read(1024), None
+
+    def _release(self, fd):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+        self.open_handles -= 1
+
+    def _close(self, proc):
+        if proc.fd is not None:
+            self._release(proc.fd)
+            proc.fd = None
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed = now - self.last_sample if self.last_sample else None
+        self.last_sample = now
+
+        seen = set()
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            proc = self.procs.get(pid)
+            try:
+                data, fd = self._read(pid, proc)
+            except OSError:
+                if proc is None or proc.fd is None:
+                    continue                # exited between listdir and read
+                # cached handle belongs to an exited process; the PID may be reused
+                self._close(self.procs.pop(pid))
+                proc = None
+                try:
+                    data, fd = self._read(pid, None)
+                except OSError:
+                    continue
+            if not data:
+                if fd is not None and (proc is None or proc.fd != fd):
+                    self._release(fd)       # freshly opened for a process that is gone
+                continue
+
+            # comm may contain spaces/parens: split on the last ')'
+            close = data.rfind(b")")
+            fields = data[close + 2:].split()
+            start = int(fields[19])
+            ticks = int(fields[11]) + int(fields[12])
+
+            if proc is None or proc.start != start:
+                if proc is not None and proc.fd != fd:
+                    self._close(proc)
+                proc = self.procs[pid] = Proc(pid, fd)
+                proc.start = start
+            elif proc.fd is None:
+                proc.fd = fd
+            proc.name = data[data.find(b"(") + 1:close].decode(errors="replace")   # comm can change (exec, prctl)
+
+            if proc.ticks is not None and elapsed:
+                proc.cpu = (ticks - proc.ticks) / self.clk_tck / elapsed * 100
+            proc.ticks = ticks
+            proc.rss = int(fields[21]) * self.page_size
+            seen.add(pid)
+
+        for pid in [pid for pid in self.procs if pid not in seen]:
+            self._close(self.procs.pop(pid))
+        return len(seen)
+
+    def top(self, n=TOP_N, key="cpu"):
+        heaviest = heapq.nlargest(n, self.procs.values(), key=lambda p: getattr(p, key))
+        return [
+            {"pid": p.pid, "name": p.name, "cpu": round(p.cpu, 1), "rss_mb": round(p.rss / (1024 * 1024), 1)}
+            for p in heaviest
+        ]
+
+    def close(self):
+        for proc in self.procs.values():
+            self._close(proc)
+        self.procs.clear()
@@ -0,0 +1,187 @@
+# result_cache.py
+# Read-through cache for read-only kubectl listings, invalidated by watches.
+#
+# Each cached kind (pods, services) has a background
+#   kubectl get <kind> --all-namespaces --watch -o jsonpath=<resourceVersion per line>
+# process. Every new resourceVersion bumps that kind's generation; an entry is
+# served only while its generation is current, so answers are never stale and
+# an idle cluster costs no API calls however often the chat asks.
+#
+# While a kind's watch is not established (starting up, kubectl missing,
+# connection lost, no output yet) reads bypass the cache and go straight to
+# kubectl. Writes made through the agent call invalidate(kind) so the next
+# read never predates them.
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from telemetry import counter, gauge
+
+WATCH_SETTLE = 2.0          # seconds a watch must stay up before entries are trusted
+WATCH_MAX_BACKOFF = 60.0
+MAX_ENTRIES = 256
+
+CACHE_REQUESTS = counter("chat_cache_requests_total", "Cached chat reads by kind and result")
+
+
+class KindWatch:
+    """Tracks the resourceVersion stream of one kind across all namespaces."""
+
+    def __init__(self, kind, on_change):
+        self.kind = kind
+        self.on_change = on_change
+        self.generation = 0
+        self.live_since = None
+        self.last_version = None
+        self.proc = None
+        self._stopped = threading.Event()
+
+    def command(self):
+        return [
+            "kubectl", "get", self.kind, "--all-namespaces", "--watch",
+            "-o", 'jsonpath={.metadata.resourceVersion}{"\\n"}',
+        ]
+
+    def live(self):
+        return self.live_since is not None and time.monotonic() - self.live_since >= WATCH_SETTLE
+
+    def start(self):
+        threading.Thread(target=self._loop, name=f"watch-{self.kind}", daemon=True).start()
+        return self
+
+    def _loop(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                self.proc = subprocess.Popen(
+                    self.command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+                )
+                self.generation += 1          # anything cached before this watch is suspect
+                self.on_change(self)
+                for line in self.proc.stdout:
+                    if self.live_since is None:
+                        # only output proves the watch is connected (a hanging kubectl never gets here)
+                        self.live_since = time.monotonic()
+                    version = line.strip()
+                    if version and version != self.last_version:
+                        self.last_version = version
+                        self.generation += 1
+                        self.on_change(self)
+                    backoff = 1.0
+                self.proc.wait()
+            except OSError:
+                pass                           # kubectl not installed
+            self.live_since = None
+            self.generation += 1
+            self.on_change(self)
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, WATCH_MAX_BACKOFF)
+
+    def stop(self):
+        self._stopped.set()
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+
+
+class WatchCache:
+    def __init__(self, kinds=("pods", "services"), max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()        # (kind, command) -> (generation, output)
+        self._kinds = kinds
+        self._watches = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def _watch(self, kind):
+        with self._lock:
+            watch = self._watches.get(kind)
+            if watch is None:
+                watch = self._watches[kind] = KindWatch(kind, self._invalidate).start()
+            return watch
+
+    def _invalidate(self, watch):
+        with self._lock:
+            for key in [k for k, (gen, _) in self._entries.items() if k[0] == watch.kind and gen != watch.generation]:
+                del self._entries[key]
+
+    def invalidate(self, kind):
+        """Forget a kind's entries now, e.g. right after the agent changed it."""
+        with self._lock:
+            watch = self._watches.get(kind)
+        if watch is not None:
+            watch.generation += 1               # loads already in flight are not stored either
+            self._invalidate(watch)
+
+    def get(self, kind, command, loader):
+        """Return loader(command), served from cache while the kind's watch says nothing changed.
+
+        If the loader raises (e.g. kubectl exited non-zero) nothing is stored.
+        """
+        if kind not in self._kinds:
+            return loader(command)
+
+        watch = self._watch(kind)
+        if not watch.live():
+            with self._lock:
+                self.bypasses += 1
+            CACHE_REQUESTS.inc(kind=kind, result="bypass")
+            return loader(command)
+
+        key = (kind, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == watch.generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(kind=kind, result="hit")
+                return entry[1]
+            self.misses += 1
+        CACHE_REQUESTS.inc(kind=kind, result="miss")
+
+        generation = watch.generation          # read before loading: a change mid-load stays a miss
+        output = loader(command)
+        with self._lock:
+            if watch.live() and generation == watch.generation:
+                self._entries[key] = (generation, output)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return output
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(output) for _, output in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "watches": {
+                    kind: {"live": w.live(), "generation": w.generation, "resource_version": w.last_version}
+                    for kind, w in self._watches.items()
+                },
+            }
+
+    def stop(self):
+        with self._lock:
+            watches = list(self._watches.values())
+        for watch in watches:
+            watch.stop()
+
+
+shared_cache = WatchCache()
+gauge("chat_cache_entries", "Entries in the chat read cache", callback=lambda: len(shared_cache))
+gauge("chat_cache_hit_ratio", "Chat read cache hit ratio", callback=lambda: shared_cache.stats()["hit_rate"])
@@ -0,0 +1,134 @@
+# Multi-cluster access – lazy per-context clients and concurrent fan-out
+# Purpose: Run the same read/diagnose operation against every kubeconfig
+#          context at once and merge the answers into one table.
+#
+#   registry = ClusterRegistry()                   # nothing is connected yet
+#   results = fan_out(registry.contexts(),
+#                     lambda ctx: registry.core_v1(ctx).list_pod_for_all_namespaces(),
+#                     timeout=10)
+#
+# Wall time is that of the slowest cluster (bounded by `timeout`), not the
+# sum: every cluster runs in its own thread and a cluster that misses its
+# deadline is reported as timed out instead of holding up the others.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+FANOUT_TIMEOUT = 10.0       # seconds per cluster
+POOL_SIZE = 8               # HTTP connections kept per cluster client
+
+# ============================================================
+# FAN-OUT
+# ============================================================
+
+class ClusterResult:
+    __slots__ = ("cluster", "value", "error", "seconds")
+
+    def __init__(self, cluster, value=None, error=None, seconds=0.0):
+        self.cluster = cluster
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def fan_out(clusters, fn, timeout=FANOUT_TIMEOUT, max_workers=None):
+    """Call fn(cluster) for every cluster concurrently; results keep the input order."""
+    clusters = list(clusters)
+    if not clusters:
+        return []
+
+    def timed(cluster):
+        start = time.perf_counter()
+        value = fn(cluster)
+        return value, time.perf_counter() - start
+
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(clusters), thread_name_prefix="fanout")
+    start = time.perf_counter()
+    futures = [(cluster, pool.submit(timed, cluster)) for cluster in clusters]
+    deadline = start + timeout
+
+    results = []
+    for cluster, future in futures:
+        try:
+            value, seconds = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            results.append(ClusterResult(cluster, value=value, seconds=seconds))
+        except FutureTimeout:
+            results.append(ClusterResult(cluster, error=f"timed out after {timeout:g}s", seconds=timeout))
+        except Exception as e:
+            results.append(ClusterResult(cluster, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - start))
+
+    # don't wait for stragglers; their threads finish in the background
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def merge_rows(results, rows_of):
+    """Flatten per-cluster values into rows prefixed by cluster name; failed clusters are returned separately."""
+    rows = []
+    errors = []
+    for result in results:
+        if result.ok:
+            rows.extend([result.cluster] + list(row) for row in rows_of(result.value))
+        else:
+            errors.append((result.cluster, result.error))
+    return rows, errors
+
+# ============================================================
+# CLIENT REGISTRY (KUBERNETES PYTHON CLIENT)
+# ============================================================
+
+class ClusterRegistry:
+    """One pooled ApiClient per kubeconfig context, created on first use."""
+
+    def __init__(self, kubeconfig=None, pool_size=POOL_SIZE):
+        self.kubeconfig = kubeconfig
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._building = {}
+
+    def contexts(self):
+        from kubernetes import config
+        contexts, _ = config.list_kube_config_contexts(config_file=self.kubeconfig)
+        return [c["name"] for c in contexts]
+
+    def client(self, context):
+        with self._lock:
+            api_client = self._clients.get(context)
+            if api_client is not None:
+                return api_client
+            build_lock = self._building.setdefault(context, threading.Lock())
+
+        # build outside the registry lock so slow contexts don't serialize the rest
+        with build_lock:
+            with self._lock:
+                api_client = self._clients.get(context)
+            if api_client is None:
+                from kubernetes import client, config
+                configuration = client.Configuration()
+                config.load_kube_config(config_file=self.kubeconfig, context=context,
+                                        client_configuration=configuration)
+                configuration.connection_pool_maxsize = self.pool_size
+                api_client = client.ApiClient(configuration)
+                with self._lock:
+                    self._clients[context] = api_client
+            return api_client
+
+    def core_v1(self, context):
+        from kubernetes import client
+        return client.CoreV1Api(self.client(context))
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for api_client in clients:
+            api_client.close()
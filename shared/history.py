@@ -0,0 +1,384 @@
+# Diagnosis history – append-only incident log in an indexed SQLite file
+# Purpose: Keep every diagnosis / AI answer instead of overwriting it, and
+#          answer "what keeps failing?" quickly.
+#
+# Each record: time, source (k8s-agent, linux-agent, ...), signature (the
+# normalized shape of the failure, stable across pods and PIDs), issue,
+# root cause, action taken, latency and the raw model response.
+#
+# Writes never block the caller: record() only enqueues. A background thread
+# commits in batches (BATCH_SIZE rows or every FLUSH_INTERVAL seconds, one
+# transaction each) and drops records rather than grow past MAX_PENDING.
+#
+#   AGENT_HISTORY_DB=path      database file (default /tmp/agent-history.db)
+#
+# Usage:
+#   from history import shared_history, signature
+#   shared_history.record(signature(issue, events[-1]), issue, root_cause=..., action="advised",
+#                         latency=1.8, source="k8s-agent", response=raw_json)
+#   shared_history.top_signatures(hours=24)      # recurring failures
+#   shared_history.warm_start()                  # {signature: latest response} for an LLM cache
+#
+#   python history.py top [--hours 24] [--limit 10]
+#   python history.py recent [--limit 20]
+#   python history.py bench [--records 100000]
+
+import atexit
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from telemetry import counter
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+HISTORY_DB = os.environ.get("AGENT_HISTORY_DB", "/tmp/agent-history.db")
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0        # seconds
+MAX_PENDING = 10000
+
+HISTORY_RECORDS = counter("history_records_total", "Diagnosis history records by result")
+
+# Signatures are interned (incidents hold a small integer). The writer also
+# keeps per-hour counts per signature in the same transaction, so "top N in
+# the last 24h" reads at most 25 hourly rows per signature plus the raw rows
+# of the partial first hour, however many incidents there are.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id          INTEGER PRIMARY KEY,
+    signature   TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS incidents (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    source      TEXT NOT NULL,
+    sig_id      INTEGER NOT NULL REFERENCES signatures (id),
+    issue       TEXT,
+    root_cause  TEXT,
+    action      TEXT,
+    latency_ms  REAL,
+    response    TEXT
+);
+CREATE INDEX IF NOT EXISTS incidents_ts ON incidents (ts, source, sig_id, latency_ms);
+CREATE INDEX IF NOT EXISTS incidents_sig ON incidents (sig_id, ts);
+CREATE TABLE IF NOT EXISTS signature_hours (
+    hour        INTEGER NOT NULL,
+    source      TEXT NOT NULL,
+    sig_id      INTEGER NOT NULL,
+    count       INTEGER NOT NULL,
+    latency_ms  REAL NOT NULL,      -- sum
+    first_ts    REAL NOT NULL,
+    last_ts     REAL NOT NULL,
+    PRIMARY KEY (hour, source, sig_id)
+) WITHOUT ROWID;
+CREATE VIEW IF NOT EXISTS incident_log AS
+    SELECT i.id, i.ts, i.source, s.signature, i.issue, i.root_cause, i.action, i.latency_ms, i.response
+    FROM incidents i JOIN signatures s ON s.id = i.sig_id;
+"""
+
+# ============================================================
+# SIGNATURES
+# ============================================================
+
+_VOLATILE = [
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"), "<uid>"),
+    (re.compile(r"-[a-z0-9]{8,10}-[a-z0-9]{5}\b"), "-<hash>"),          # deployment pod suffix
+    (re.compile(r"\b(?:sha256:)?[0-9a-f]{12,64}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "#"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize(text, *names):
+    """Strip what differs between occurrences of the same failure (names, ids, numbers)."""
+    text = str(text or "")
+    for name in names:
+        if name:
+            text = text.replace(name, "<name>")
+    for pattern, repl in _VOLATILE:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+
+def signature(*parts, names=()):
+    return " | ".join(normalize(part, *names) for part in parts if part)
+
+# ============================================================
+# STORE
+# ============================================================
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._ready = False
+        self.written = 0
+        self.dropped = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._ready:
+            conn.executescript(SCHEMA)
+            self._ready = True
+        return conn
+
+    # ---------------- writes ----------------
+    def record(self, signature, issue, root_cause="", action="", latency=0.0, source="", response=None,
+               ts=None):
+        """Queue one record; returns False (and counts a drop) if the writer is too far behind."""
+        row = (ts or time.time(), source, signature, issue, root_cause, action,
+               round(latency * 1000, 1), response)
+        if self._writer is None:
+            self._start()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            HISTORY_RECORDS.inc(result="dropped")
+            return False
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _write_loop(self):
+        conn = self._connect()
+        sig_ids = {}
+        while True:
+            batch, waiters, stop = [], [], False
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with conn:
+                        rows = [row[:2] + (self._sig_id(conn, sig_ids, row[2]),) + row[3:] for row in batch]
+                        conn.executemany(
+                            "INSERT INTO incidents (ts, source, sig_id, issue, root_cause, action, "
+                            "latency_ms, response) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows,
+                        )
+                        conn.executemany(
+                            "INSERT INTO signature_hours VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (hour, source, sig_id) DO UPDATE SET "
+                            "count = count + excluded.count, latency_ms = latency_ms + excluded.latency_ms, "
+                            "first_ts = MIN(first_ts, excluded.first_ts), last_ts = MAX(last_ts, excluded.last_ts)",
+                            self._hourly(rows),
+                        )
+                    self.written += len(batch)
+                    HISTORY_RECORDS.inc(len(batch), result="written")
+                except sqlite3.Error as e:
+                    sig_ids.clear()             # ids inserted in the failed transaction are gone
+                    self.dropped += len(batch)
+                    HISTORY_RECORDS.inc(len(batch), result="dropped")
+                    print(f"history: dropped {len(batch)} records ({e})", file=sys.stderr)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                conn.close()
+                return
+
+    @staticmethod
+    def _hourly(rows):
+        buckets = {}
+        for ts, source, sig_id, _, _, _, latency_ms, _ in rows:
+            key = (int(ts // 3600), source, sig_id)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, latency_ms or 0.0, ts, ts]
+            else:
+                bucket[0] += 1
+                bucket[1] += latency_ms or 0.0
+                bucket[2] = min(bucket[2], ts)
+                bucket[3] = max(bucket[3], ts)
+        return [key + tuple(bucket) for key, bucket in buckets.items()]
+
+    @staticmethod
+    def _sig_id(conn, sig_ids, signature):
+        sig_id = sig_ids.get(signature)
+        if sig_id is None:
+            conn.execute("INSERT OR IGNORE INTO signatures (signature) VALUES (?)", (signature,))
+            sig_id = sig_ids[signature] = conn.execute(
+                "SELECT id FROM signatures WHERE signature = ?", (signature,)
+            ).fetchone()[0]
+        return sig_id
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is committed."""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    # ---------------- queries ----------------
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def top_signatures(self, hours=24, limit=10, source=None):
+        """Most frequent signatures since `hours` ago, with their latest issue/root cause."""
+        since = time.time() - hours * 3600
+        first_hour = -int(-since // 3600)          # first whole hour inside the window
+        return self._query(
+            """
+            WITH in_window AS (
+                SELECT sig_id, count, latency_ms, first_ts, last_ts FROM signature_hours
+                WHERE hour >= :hour AND (:source IS NULL OR source = :source)
+                UNION ALL
+                SELECT sig_id, 1, latency_ms, ts, ts FROM incidents
+                WHERE ts >= :since AND ts < :hour * 3600 AND (:source IS NULL OR source = :source)
+            ), top AS (
+                SELECT sig_id, SUM(count) AS count, MIN(first_ts) AS first_seen, MAX(last_ts) AS last_seen,
+                       ROUND(SUM(latency_ms) / SUM(count), 1) AS avg_latency_ms
+                FROM in_window
+                GROUP BY sig_id
+                ORDER BY count DESC, last_seen DESC
+                LIMIT :limit
+            )
+            SELECT s.signature, t.count, t.first_seen, t.last_seen, t.avg_latency_ms,
+                   i.issue, i.root_cause, i.action
+            FROM top t
+            JOIN signatures s ON s.id = t.sig_id
+            JOIN incidents i ON i.id = (
+                SELECT id FROM incidents
+                WHERE sig_id = t.sig_id AND (:source IS NULL OR source = :source)
+                ORDER BY ts DESC LIMIT 1
+            )
+            ORDER BY t.count DESC, t.last_seen DESC
+            """,
+            {"hour": first_hour, "since": since, "source": source, "limit": limit},
+        )
+
+    def recent(self, limit=20, source=None):
+        return self._query(
+            "SELECT * FROM incident_log WHERE (? IS NULL OR source = ?) ORDER BY id DESC LIMIT ?",
+            (source, source, limit),
+        )
+
+    def latest(self, signature):
+        rows = self._query(
+            "SELECT * FROM incident_log WHERE signature = ? ORDER BY ts DESC LIMIT 1", (signature,)
+        )
+        return rows[0] if rows else None
+
+    def warm_start(self, hours=24 * 7, source=None, limit=1000):
+        """{signature: latest response} for the most recent signatures, to pre-fill a response cache."""
+        since = time.time() - hours * 3600
+        rows = self._query(
+            """
+            SELECT signature, response FROM incident_log
+            WHERE id IN (
+                SELECT MAX(id) FROM incidents
+                WHERE ts >= ? AND response IS NOT NULL AND (? IS NULL OR source = ?)
+                GROUP BY sig_id
+            )
+            ORDER BY id DESC LIMIT ?
+            """,
+            (since, source, source, limit),
+        )
+        return {row["signature"]: row["response"] for row in rows}
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+shared_history = HistoryStore()
+
+# ============================================================
+# CLI
+# ============================================================
+
+def _bench(records):
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    store = HistoryStore(path, max_pending=records)
+    issues = ["CrashLoopBackOff", "OOMKilled", "ImagePullBackOff", "Error", "Pending"]
+    now = time.time()
+
+    start = time.perf_counter()
+    for i in range(records):
+        issue = issues[i % len(issues)]
+        store.record(f"{issue} | back-off restarting failed container app-{i % 50}", issue,
+                     root_cause="synthetic", action="advised", latency=1.5, source="bench",
+                     response='{"fix": "..."}', ts=now - (i % 172800))
+    enqueue = time.perf_counter() - start
+    store.flush(timeout=120)
+    committed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = store.top_signatures(hours=24, limit=10)
+    query = time.perf_counter() - start
+    store.close()
+
+    print(f"records={records} dropped={store.dropped} file={os.path.getsize(path) / 1e6:.1f}MB")
+    print(f"record(): {enqueue / records * 1e6:.1f} us/op on the caller, "
+          f"{records / committed:.0f} rows/s committed")
+    print(f"top_signatures(24h): {query * 1000:.1f} ms, top={top[0]['signature']!r} x{top[0]['count']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Diagnosis history")
+    parser.add_argument("command", choices=["top", "recent", "bench"])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--source")
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        _bench(args.records)
+    elif args.command == "top":
+        for row in shared_history.top_signatures(args.hours, args.limit, args.source):
+            print(f"{row['count']:>6}  {row['signature']}")
+            print(f"        last: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['last_seen']))}"
+                  f"  avg {row['avg_latency_ms']} ms  action: {row['action']}  cause: {row['root_cause']}")
+    else:
+        for row in shared_history.recent(args.limit, args.source):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['ts']))}  {row['source']:<12} "
+                  f"{row['signature']}  [{row['action']}, {row['latency_ms']} ms]")
@@ -0,0 +1,427 @@
+# Telemetry – spans, Prometheus metrics and a sampling profiler
+# Purpose: One lightweight instrumentation layer shared by every agent.
+#
+# Spans
+#   AGENT_TRACING=1            enable spans (default off: span() is a shared
+#                              no-op and @traced returns the function untouched)
+#   AGENT_TRACE_FILE=path      append finished spans as JSON lines
+#   If opentelemetry is installed, spans go through its global tracer as
+#   well, so any configured OTel exporter receives them.
+#
+# Metrics
+#   REGISTRY.render() produces the Prometheus text format; the Flask apps
+#   serve it on /metrics (instrument_flask), other processes via serve_metrics().
+#   Span durations land in agent_span_duration_seconds.
+#
+# Profiler
+#   AGENT_PROFILE=path         sample all thread stacks every AGENT_PROFILE_INTERVAL
+#                              seconds (default 0.01) and write collapsed stacks
+#                              (flamegraph.pl / speedscope format) on exit.
+#
+# Usage:
+#   from telemetry import span, traced, REGISTRY
+#
+#   @traced("k8s.get_pod", kind="api")
+#   def get_pod(...): ...
+#
+#   with span("render", kind="render"):
+#       print(table)
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+ENABLED = os.environ.get("AGENT_TRACING", "0") == "1"
+TRACE_FILE = os.environ.get("AGENT_TRACE_FILE")
+PROFILE_FILE = os.environ.get("AGENT_PROFILE")
+PROFILE_INTERVAL = float(os.environ.get("AGENT_PROFILE_INTERVAL", "0.01"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_tracer = None
+if ENABLED:
+    try:
+        from opentelemetry import trace as _otel_trace
+        _tracer = _otel_trace.get_tracer("devsecops-agent")
+    except ImportError:
+        pass
+
+# ============================================================
+# METRICS (PROMETHEUS TEXT FORMAT)
+# ============================================================
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help, callback=None):
+        self.name = name
+        self.help = help
+        self.callback = callback        # returns {labels-dict-as-tuple: value} or a number
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def samples(self):
+        if self.callback is not None:
+            value = self.callback()
+            if isinstance(value, dict):
+                return [(self.name, key, v) for key, v in value.items()]
+            return [(self.name, (), value)]
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}               # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, count in zip(self.buckets, row):
+                    out.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), count))
+                out.append((f"{self.name}_bucket", key + (("le", "+Inf"),), row[-1]))
+                out.append((f"{self.name}_sum", key, row[-2]))
+                out.append((f"{self.name}_count", key, row[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help):
+    return REGISTRY.register(Counter(name, help))
+
+
+def gauge(name, help, callback=None):
+    return REGISTRY.register(Gauge(name, help, callback))
+
+
+def histogram(name, help, buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, buckets))
+
+
+SPAN_SECONDS = histogram("agent_span_duration_seconds", "Duration of instrumented agent operations")
+SPAN_ERRORS = counter("agent_span_errors_total", "Instrumented operations that raised")
+
+# ============================================================
+# SPANS
+# ============================================================
+
+_current = contextvars.ContextVar("agent_span", default=None)
+_trace_lock = threading.Lock()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start", "_token", "_otel", "_otel_cm")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self._otel = None
+        self._otel_cm = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self._token = _current.set(self)
+        if _tracer is not None:
+            self._otel_cm = _tracer.start_as_current_span(self.name, attributes=self.attributes)
+            self._otel = self._otel_cm.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current.reset(self._token)
+        kind = self.attributes.get("kind", "internal")
+        SPAN_SECONDS.observe(duration, span=self.name, kind=kind)
+        if exc_type is not None:
+            SPAN_ERRORS.inc(span=self.name, kind=kind)
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        if self._otel_cm is not None:
+            self._otel_cm.__exit__(exc_type, exc, tb)
+        if TRACE_FILE:
+            _export(self, duration)
+        return False
+
+
+def _export(s, duration):
+    record = {
+        "trace_id": s.trace_id,
+        "span_id": s.span_id,
+        "parent_id": s.parent_id,
+        "name": s.name,
+        "duration_ms": round(duration * 1000, 3),
+        "end": time.time(),
+        "attributes": {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in s.attributes.items()},
+    }
+    with _trace_lock:
+        with open(TRACE_FILE, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def span(name, **attributes):
+    """Context manager for one unit of work; free when tracing is disabled."""
+    if not ENABLED:
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name=None, **attributes):
+    """Decorator form of span(); returns the function itself when tracing is disabled."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(span_name, dict(attributes)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# ============================================================
+# FLASK INTEGRATION
+# ============================================================
+
+HTTP_SECONDS = histogram("http_request_duration_seconds", "Flask request latency")
+
+
+def instrument_flask(app):
+    """Time every request and serve REGISTRY on /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._telemetry_start = time.perf_counter()
+
+    @app.after_request
+    def _stop_timer(response):
+        start = getattr(g, "_telemetry_start", None)
+        if start is not None:
+            HTTP_SECONDS.observe(
+                time.perf_counter() - start,
+                route=request.url_rule.rule if request.url_rule else "unmatched",
+                method=request.method,
+                status=response.status_code,
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
+    return app
+
+def serve_metrics(port, host="0.0.0.0"):
+    """Serve REGISTRY on http://host:port/metrics from a daemon thread (non-Flask processes)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="telemetry-metrics", daemon=True).start()
+    return server
+
+# ============================================================
+# SAMPLING PROFILER (OPT-IN)
+# ============================================================
+
+class SamplingProfiler:
+    """Samples every thread's stack on a timer; writes collapsed stacks."""
+
+    def __init__(self, path, interval=PROFILE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stacks = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=1)
+        with open(self.path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+profiler = SamplingProfiler(PROFILE_FILE).start() if PROFILE_FILE else None
+
+# ============================================================
+# OVERHEAD CHECK
+# ============================================================
+
+if __name__ == "__main__":
+    n = 1_000_000
+
+    def bare():
+        return None
+
+    @traced("bench")
+    def wrapped():
+        return None
+
+    start = time.perf_counter()
+    for _ in range(n):
+        bare()
+    base = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        wrapped()
+    deco = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench"):
+            pass
+    ctx = time.perf_counter() - start
+
+    state = "enabled" if ENABLED else "disabled"
+    print(f"tracing {state}: call {base / n * 1e9:.0f} ns, @traced call {deco / n * 1e9:.0f} ns, "
+          f"with span() {ctx / n * 1e9:.0f} ns per op")